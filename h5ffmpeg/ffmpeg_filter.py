@@ -130,6 +130,7 @@ def ffmpeg(
     width=None,
     height=None,
     depth=None,
+    threads=None,
     **kwargs,
 ):
     """
@@ -159,6 +160,8 @@ def ffmpeg(
         Custom height override (default: auto-detected from data)
     depth : int, optional
         Custom depth override (default: auto-detected from data)
+    threads : int, optional
+        Maximum number of encoder threads (default: codec decides)
     **kwargs : dict
         Additional parameters (reserved for future use)
 
@@ -216,11 +219,11 @@ def ffmpeg(
     # Check for hardware acceleration conflicts
     if gpu_id >= 0:
         # For NVIDIA encoders, check if NVIDIA GPU is available
-        if "nvenc" in codec and not has_nvidia_gpu():
+        if codec.endswith("_nvenc") and not has_nvidia_gpu():
             raise RuntimeError(f"{codec} requested but NVIDIA GPU not detected.")
 
         # For Intel QSV encoders, check if Intel GPU is available
-        if "qsv" in codec and not has_intel_gpu():
+        if codec.endswith("_qsv") and not has_intel_gpu():
             raise RuntimeError(f"{codec} requested but Intel GPU not detected.")
 
     # Pack all parameters into the filter options
@@ -237,6 +240,8 @@ def ffmpeg(
         film_grain,
         gpu_id,
     )
+    if threads:
+        filter_options += (int(threads),)
 
     return {
         "compression": FFMPEG_ID,
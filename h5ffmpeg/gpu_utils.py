@@ -106,7 +106,7 @@ def validate_and_adjust_gpu_id(codec, requested_gpu_id):
     gpu_info = detect_available_gpus()
     
     # For NVIDIA codecs
-    if "nvenc" in codec or "cuvid" in codec:
+    if codec.endswith(("_nvenc", "_cuvid")):
         if gpu_info["nvidia"] == 0:
             logger.warning(f"NVIDIA codec {codec} requested but no NVIDIA GPUs detected. Falling back to CPU.")
             return -1
@@ -116,7 +116,7 @@ def validate_and_adjust_gpu_id(codec, requested_gpu_id):
             return adjusted_id
     
     # For Intel QSV codecs
-    elif "qsv" in codec:
+    elif codec.endswith("_qsv"):
         if gpu_info["intel"] == 0:
             logger.warning(f"Intel QSV codec {codec} requested but no Intel GPU detected. Falling back to CPU.")
             return -1
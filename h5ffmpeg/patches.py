@@ -1,70 +1,281 @@
 import h5py
 import numpy as np
 import math
+import functools
+import weakref
 from collections.abc import Iterable
 from .ffmpeg_filter import modify_compression_opts
 
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
 FFMPEG_ID = 32030
 MAX_CHUNK_SIZE = 4 * 1024**3  # 4 GB
 
+# compression_opts[5] -> bit depth, and the "data_type" attr encoding
+_BIT_MAP = {0: 8, 1: 10, 2: 12}
+_DTYPE_CODE = {np.dtype("uint8"): 0, np.dtype("uint16"): 1, np.dtype("float32"): 2}
+_CODE_DTYPE = {0: np.uint8, 1: np.uint16, 2: np.float32}
+_DTYPE_MAX = {np.dtype("uint8"): 255, np.dtype("uint16"): 65535}
+
 # Store the original methods
 _original_dataset_getitem = h5py.Dataset.__getitem__
 _original_dataset_setitem = h5py.Dataset.__setitem__
 
 
-# Define new getitem method
-def _patched_getitem(self, key):
-    compression = self.attrs.get("compression", 0)
+# Quantization math, done in place on a single float32 buffer
+def _dequantize(data, norm, beta, bit, max_val, min_val, dtype):
+    max_bitType_val = (1 << bit) - 1
+    has_beta = beta != 1.0 and beta > 0
 
-    if compression == FFMPEG_ID:
-        compression_opts = self.attrs.get("compression_opts", 0)
-        self.attrs.set("compression_opts", modify_compression_opts(compression_opts))
+    data = data.astype(np.float32, copy=False)
+    if norm and ne is not None:
+        # One fused, multi-threaded pass instead of one pass per ufunc
+        ne.evaluate(
+            "((data * inv_mb) ** inv_beta) * span + minv",
+            local_dict={
+                "data": data,
+                "inv_mb": np.float32(1.0 / max_bitType_val),
+                "inv_beta": np.float32(1.0 / beta if has_beta else 1.0),
+                "span": np.float32(max_val - min_val),
+                "minv": np.float32(min_val),
+            },
+            out=data,
+            casting="unsafe",
+        )
+    elif norm:
+        if has_beta:
+            data *= 1.0 / max_bitType_val
+            np.power(data, 1.0 / beta, out=data)
+            data *= max_val - min_val
+        else:
+            data *= (max_val - min_val) / max_bitType_val
+        data += min_val
+    elif has_beta:
+        np.power(data, 1.0 / beta, out=data)
+        data += min_val
+        np.clip(data, min_val, max_val, out=data)
+    else:
+        np.clip(data, min_val, max_val, out=data)
 
-    data = _original_dataset_getitem(self, key)
+    return data.astype(dtype, copy=False)
 
-    # Check if this dataset should be quantized
-    if "bit" not in self.attrs:
-        return data
 
-    norm = self.attrs.get("norm", False)
-    beta = self.attrs.get("beta", 1.0)
-    dtype_map = {0: np.uint8, 1: np.uint16, 2: np.float32}
-    dtype = dtype_map.get(self.attrs.get("data_type", 0), np.uint8)
+@functools.lru_cache(maxsize=64)
+def _build_dequant_lut(stored_dtype, norm, beta, bit, max_val, min_val, dtype):
+    # Integer samples have at most 65536 distinct values, so the whole
+    # dequant pipeline (pow, scale, clip, cast) collapses into one gather
+    codes = np.arange(np.iinfo(stored_dtype).max + 1, dtype=stored_dtype)
+    lut = _dequantize(codes, norm, beta, bit, max_val, min_val, dtype)
+    lut.flags.writeable = False
+    return lut
 
-    if not norm and beta == 1.0:
-        return data
 
-    bit = self.attrs.get("bit", 8)
+def _quantize(data, norm, beta, bit, max_val, min_val, dtype):
     max_bitType_val = (1 << bit) - 1
-    max_val = self.attrs.get("init_max_intensity", max_bitType_val)
-    min_val = self.attrs.get("init_min_intensity", 0)
-
-    data = data.astype(np.float32, copy=False)
-    if norm:
-        if beta != 1.0 and beta > 0:
-            np.power(data / max_bitType_val, 1 / beta, out=data)
-            data *= max_val - min_val
-            data += min_val
+    has_beta = beta != 1.0 and beta > 0
+
+    if norm and ne is not None:
+        ne.evaluate(
+            "((data - minv) * inv_span) ** beta * mb",
+            local_dict={
+                "data": data,
+                "minv": np.float32(min_val),
+                "inv_span": np.float32(1.0 / (max_val - min_val)),
+                "beta": np.float32(beta if has_beta else 1.0),
+                "mb": np.float32(max_bitType_val),
+            },
+            out=data,
+            casting="unsafe",
+        )
+    elif norm:
+        data -= min_val
+        if has_beta:
+            data *= 1.0 / (max_val - min_val)
+            np.power(data, beta, out=data)
+            data *= max_bitType_val
         else:
-            data = data / max_bitType_val * (max_val - min_val) + min_val
-    elif beta != 1.0 and beta > 0:
-        np.power(data, 1 / beta, out=data)
-        np.clip(data + min_val, min_val, max_val, out=data)
+            data *= max_bitType_val / (max_val - min_val)
     else:
-        np.clip(data, min_val, max_val, out=data)
+        if has_beta:
+            data -= min_val  # Fix: Subtract min_val before power scaling
+            np.power(data, beta, out=data)
+        # Clamp and narrow to the target dtype in the same pass
+        return np.clip(
+            data,
+            0,
+            max_bitType_val,
+            out=np.empty(np.shape(data), dtype=dtype),
+            casting="unsafe",
+        )
 
     return data.astype(dtype, copy=False)
 
 
+def _minmax(data, block=1 << 18):
+    # Reduce min and max over cache-sized blocks, so the array is streamed
+    # from memory once instead of once per reduction
+    if data.size <= block or not data.flags.c_contiguous:
+        return np.amin(data), np.amax(data)
+
+    flat = data.ravel()
+    mins = []
+    maxs = []
+    for start in range(0, flat.size, block):
+        part = flat[start : start + block]
+        mins.append(part.min())
+        maxs.append(part.max())
+    return np.min(mins), np.max(maxs)
+
+
+# Per-Dataset quantization metadata, so reads and writes skip the HDF5
+# attribute probes after the first access. Keyed by id() and dropped when
+# the Dataset object is collected; attributes edited behind an open handle
+# are not picked up until the dataset is reopened.
+_QUANT_META_CACHE = {}
+
+
+def _read_quant_meta(dset):
+    attrs = dset.attrs
+
+    if attrs.get("compression", 0) == FFMPEG_ID:
+        compression_opts = attrs.get("compression_opts", 0)
+        attrs.set("compression_opts", modify_compression_opts(compression_opts))
+
+    # Check if this dataset should be quantized
+    if "bit" not in attrs:
+        return None
+
+    return (
+        attrs.get("norm", False),
+        attrs.get("beta", 1.0),
+        int(attrs.get("bit", 8)),
+        attrs.get("init_max_intensity", None),
+        attrs.get("init_min_intensity", 0),
+        _CODE_DTYPE.get(int(attrs.get("data_type", 0)), np.uint8),
+    )
+
+
+def _cache_quant_meta(dset, meta):
+    key = id(dset)
+    if key not in _QUANT_META_CACHE:
+        weakref.finalize(dset, _QUANT_META_CACHE.pop, key, None)
+    _QUANT_META_CACHE[key] = meta
+
+
+def _get_quant_meta(dset):
+    try:
+        return _QUANT_META_CACHE[id(dset)]
+    except KeyError:
+        meta = _read_quant_meta(dset)
+        _cache_quant_meta(dset, meta)
+        return meta
+
+
+@functools.lru_cache(maxsize=64)
+def _make_dequant(meta):
+    # Resolve the branch and constants once per distinct metadata tuple, so
+    # each read is a single call into the specialized path
+    norm, beta, bit, max_val, min_val, dtype = meta
+    identity = not norm and beta == 1.0
+
+    if max_val is None:
+        max_val = (1 << bit) - 1
+
+    if not norm and not beta > 0 and np.issubdtype(dtype, np.integer):
+        # Clip-only mapping back into the stored dtype: skip float32 entirely
+        info = np.iinfo(dtype)
+        lo = max(int(min_val), info.min)
+        hi = min(int(max_val), info.max)
+        clip_only = dtype
+    else:
+        clip_only = None
+
+    lut_args = (bool(norm), float(beta), int(bit), float(max_val), float(min_val))
+
+    def apply(data, out=None):
+        if identity:
+            result = data
+        elif clip_only is not None and data.dtype == clip_only:
+            if lo == info.min and hi == info.max:
+                result = data
+            else:
+                result = np.clip(
+                    data, lo, hi, out=data if isinstance(data, np.ndarray) else None
+                )
+        elif data.dtype in (np.uint8, np.uint16):
+            # Gather straight into the caller's buffer when one is given
+            lut = _build_dequant_lut(data.dtype.type, *lut_args, dtype)
+            return np.take(lut, data, out=out, mode="clip")
+        else:
+            result = _dequantize(data, norm, beta, bit, max_val, min_val, dtype)
+
+        if out is None:
+            return result
+        out[...] = result
+        return out
+
+    return apply
+
+
+def _apply_dequant(data, meta, out=None):
+    return _make_dequant(meta)(data, out)
+
+
+def _is_full_selection(key, ndim):
+    # dset[()], dset[:], dset[...] and dset[:, :, ...] all select everything;
+    # too many indices or a second Ellipsis are left to h5py to reject
+    if not isinstance(key, tuple):
+        key = (key,)
+    n_ellipsis = sum(k is Ellipsis for k in key)
+    if n_ellipsis > 1 or len(key) - n_ellipsis > ndim:
+        return False
+    return all(
+        k is Ellipsis or (isinstance(k, slice) and k == slice(None)) for k in key
+    )
+
+
+def _write(dset, key, data):
+    # Whole-dataset writes go straight to HDF5 without h5py's selection and
+    # conversion buffers
+    if (
+        _is_full_selection(key, dset.ndim)
+        and isinstance(data, np.ndarray)
+        and data.shape == dset.shape
+        and data.flags.c_contiguous
+    ):
+        dset.write_direct(data)
+    else:
+        _original_dataset_setitem(dset, key, data)
+
+
+# Define new getitem method
+def _patched_getitem(self, key):
+    meta = _get_quant_meta(self)
+
+    if meta is not None and self.ndim > 0 and _is_full_selection(key, self.ndim):
+        data = np.empty(self.shape, dtype=self.dtype)
+        self.read_direct(data)
+    else:
+        data = _original_dataset_getitem(self, key)
+
+    if meta is None:
+        return data
+
+    return _apply_dequant(data, meta)
+
+
 # Define new setitem method
 def _patched_setitem(self, key, value):
-    # Check if this dataset should be quantized
-    if "bit" not in self.attrs:
+    meta = _get_quant_meta(self)
+
+    if meta is None:
         _original_dataset_setitem(self, key, value)
         return
 
-    norm = self.attrs.get("norm", False)
-    beta = self.attrs.get("beta", 1.0)
+    norm, beta, bit, max_val, min_val, _ = meta
 
     if not norm and beta == 1.0:
         _original_dataset_setitem(self, key, value)
@@ -75,32 +286,20 @@ def _patched_setitem(self, key, value):
     else:
         dtype = value.dtype
 
-    data = np.asarray(value, dtype=np.float32)
-    bit = self.attrs.get("bit", 8)
-    max_bitType_val = (1 << bit) - 1
+    if not norm and not beta > 0 and np.issubdtype(dtype, np.integer):
+        # Clip-only mapping of integer input: skip float32 entirely
+        hi = min((1 << bit) - 1, np.iinfo(dtype).max)
+        _write(self, key, np.clip(value, 0, hi))
+        return
 
-    # Fix: Safe handling of dtype for np.iinfo
-    try:
-        default_max = np.iinfo(dtype).max if dtype in [np.uint8, np.uint16] else 255
-    except:
-        default_max = 255
-    max_val = self.attrs.get("init_max_intensity", default_max)
-    min_val = self.attrs.get("init_min_intensity", 0)
+    # _quantize works in place, so take exactly one float32 copy and never
+    # touch the caller's array
+    data = np.array(value, dtype=np.float32)
 
-    if norm:
-        data -= min_val
-        data /= max_val - min_val
-        if beta != 1.0 and beta > 0:
-            np.power(data, beta, out=data)
-        data *= max_bitType_val
-    elif beta != 1.0 and beta > 0:
-        data -= min_val  # Fix: Subtract min_val before power scaling
-        np.power(data, beta, out=data)
-        np.clip(data, 0, max_bitType_val, out=data)
-    else:
-        np.clip(data, 0, max_bitType_val, out=data)
+    if max_val is None:
+        max_val = _DTYPE_MAX.get(np.dtype(dtype), 255)
 
-    _original_dataset_setitem(self, key, data.astype(dtype, copy=False))
+    _write(self, key, _quantize(data, norm, beta, bit, max_val, min_val, dtype))
 
 
 # Apply the patches
@@ -118,9 +317,7 @@ def _patched_create_dataset(self, name, shape=None, dtype=None, data=None, **kwa
         norm = kwargs.pop("norm", False)
         beta = kwargs.pop("beta", 1.0)
         compression_opts = list(kwargs.get("compression_opts", ()))
-        bit = {0: 8, 1: 10, 2: 12}.get(
-            compression_opts[5] if len(compression_opts) > 5 else 0, 8
-        )
+        bit = _BIT_MAP.get(compression_opts[5] if len(compression_opts) > 5 else 0, 8)
         use_quant = False
 
         if data is not None:
@@ -153,15 +350,16 @@ def _patched_create_dataset(self, name, shape=None, dtype=None, data=None, **kwa
             element_size = final_dtype.itemsize
             full_size = math.prod(final_shape) * element_size
 
-            if full_size <= MAX_CHUNK_SIZE:
-                chunks = final_shape
-            else:
-                scale = (MAX_CHUNK_SIZE / full_size) ** (1 / len(final_shape))
-                chunks = tuple(
-                    max(1, min(dim, int(dim * scale))) for dim in final_shape
-                )
+            # Halve the largest dimension until a chunk fits under the cap
+            chunks = list(final_shape)
+            while full_size > MAX_CHUNK_SIZE:
+                i = max(range(len(chunks)), key=chunks.__getitem__)
+                if chunks[i] == 1:
+                    break
+                chunks[i] = (chunks[i] + 1) // 2
+                full_size = math.prod(chunks) * element_size
 
-            kwargs["chunks"] = chunks
+            kwargs["chunks"] = tuple(chunks)
 
         elif isinstance(user_chunks, tuple):
             chunks = user_chunks
@@ -199,7 +397,7 @@ def _patched_create_dataset(self, name, shape=None, dtype=None, data=None, **kwa
                     data = np.power(data, beta)
 
             elif data_dtype == np.float32:  # MRI/CT has negative values
-                init_min, init_max = np.amin(data), np.amax(data)
+                init_min, init_max = _minmax(data)
                 max_bit_val = (1 << bit) - 1
 
                 if norm:
@@ -222,20 +420,38 @@ def _patched_create_dataset(self, name, shape=None, dtype=None, data=None, **kwa
         dset = _original_group_create_dataset(self, name, shape, dtype, data, **kwargs)
 
         if use_quant:
+            init_max = init_max if init_max is not None else (1 << bit) - 1
+            init_min = init_min if init_min is not None else 0
+            data_type = _DTYPE_CODE.get(np.dtype(data_dtype), 0)
+
+            # Collect the attributes, then create them in a single loop
+            quant_attrs = {}
             if norm:
-                dset.attrs["norm"] = norm
-            dset.attrs["bit"] = bit
+                quant_attrs["norm"] = norm
+            quant_attrs["bit"] = np.uint8(bit)
             if beta != 1.0:
-                dset.attrs["beta"] = beta
-
-            final_dtype = dtype or (data.dtype if data is not None else np.uint8)
-            max_bit_val = (1 << bit) - 1
-            dset.attrs["init_max_intensity"] = (
-                init_max if init_max is not None else max_bit_val
+                quant_attrs["beta"] = beta
+            quant_attrs["init_max_intensity"] = np.float32(init_max)
+            quant_attrs["init_min_intensity"] = np.float32(init_min)
+            quant_attrs["data_type"] = np.uint8(data_type)
+
+            for key, value in quant_attrs.items():
+                dset.attrs.create(key, value)
+
+            # Seed the metadata cache so the first read skips the attrs probe
+            _cache_quant_meta(
+                dset,
+                (
+                    norm,
+                    beta,
+                    bit,
+                    init_max,
+                    init_min,
+                    _CODE_DTYPE[data_type],
+                ),
             )
-            dset.attrs["init_min_intensity"] = init_min if init_min is not None else 0
-            dtype_map = {"uint8": 0, "uint16": 1, "float32": 2}
-            dset.attrs["data_type"] = dtype_map.get(str(data_dtype), 0)
+        else:
+            _cache_quant_meta(dset, None)
 
         return dset
     else:
@@ -1,8 +1,34 @@
+import functools
 import os
 import tempfile
 import numpy as np
 import h5py
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+@functools.lru_cache(maxsize=1)
+def _squared_error_kernel():
+    # Import and compile the numba kernel on first use only, so importing
+    # this module never pays for numba; None when numba is missing
+    try:
+        from numba import njit, prange
+    except ImportError:
+        return None
+
+    @njit(parallel=True, fastmath=True)
+    def _squared_error_sum(a, b):
+        total = 0.0
+        for i in prange(a.size):
+            d = np.float64(a[i]) - np.float64(b[i])
+            total += d * d
+        return total
+
+    return _squared_error_sum
+
+
+# Below this size the numba kernel's thread start-up outweighs the gain
+_NUMBA_MIN_BYTES = 1 << 20
 
 
 def create_temp_h5_file():
@@ -32,6 +58,39 @@ def cleanup_temp_file(file_path):
         os.remove(file_path)
 
 
+def _squared_error(original, compressed):
+    # Sum of squared differences, accumulated in float64
+    kernel = (
+        _squared_error_kernel()
+        if original.nbytes >= _NUMBA_MIN_BYTES and original.shape == compressed.shape
+        else None
+    )
+    if kernel is not None:
+        # Multi-threaded single pass, no temporary at all
+        return kernel(
+            np.ascontiguousarray(original).ravel(),
+            np.ascontiguousarray(compressed).ravel(),
+        )
+
+    # Subtract straight into a float64 buffer (no unsigned wrap-around),
+    # then let a single dot product square and sum it
+    diff = np.subtract(original, compressed, dtype=np.float64).ravel()
+    return np.dot(diff, diff)
+
+
+def _psnr_from_mse(mse, dtype):
+    if mse == 0:
+        return float("inf")
+
+    if dtype == np.uint8:
+        max_pixel = 255.0
+    else:  # np.uint16
+        max_pixel = 65535.0
+
+    psnr = 20 * np.log10(max_pixel / np.sqrt(mse))
+    return psnr
+
+
 def calculate_psnr(original, compressed):
     """
     Calculate Peak Signal-to-Noise Ratio between original and compressed data.
@@ -48,17 +107,39 @@ def calculate_psnr(original, compressed):
     float
         PSNR value in dB
     """
-    mse = np.mean((original - compressed) ** 2)
-    if mse == 0:
-        return float("inf")
+    mse = _squared_error(original, compressed) / original.size
+    return _psnr_from_mse(mse, original.dtype)
 
-    if original.dtype == np.uint8:
-        max_pixel = 255.0
-    else:  # np.uint16
-        max_pixel = 65535.0
 
-    psnr = 20 * np.log10(max_pixel / np.sqrt(mse))
-    return psnr
+def calculate_psnr_chunked(original, dset):
+    """
+    Calculate PSNR between original data and a chunked, unquantized HDF5
+    dataset, reading the dataset one chunk at a time.
+
+    Only a single chunk-sized buffer is allocated, so the decompressed
+    dataset never has to fit in memory as a whole.
+
+    Parameters:
+    -----------
+    original : numpy.ndarray
+        Original data
+    dset : h5py.Dataset
+        Chunked dataset holding the compressed data
+
+    Returns:
+    --------
+    float
+        PSNR value in dB
+    """
+    buf = np.empty(dset.chunks, dtype=dset.dtype)
+    sse = 0.0
+    for sel in dset.iter_chunks():
+        # Edge chunks only fill the leading corner of the buffer
+        local = tuple(slice(0, s.stop - s.start) for s in sel)
+        dset.read_direct(buf, source_sel=sel, dest_sel=local)
+        sse += _squared_error(original[sel], buf[local])
+
+    return _psnr_from_mse(sse / original.size, original.dtype)
 
 
 def calculate_compression_ratio(original_size, compressed_size):
@@ -97,7 +178,86 @@ def get_file_size(file_path):
     return os.path.getsize(file_path)
 
 
-def compress_and_decompress(data, compression_options, dataset_name="data"):
+def open_h5_for_read(file_path, chunk_bytes=None):
+    """
+    Open an HDF5 file for reading with a chunk cache large enough to hold
+    a whole chunk, so FFMPEG-compressed chunks are not decoded repeatedly.
+
+    Parameters:
+    -----------
+    file_path : str
+        Path to the file
+    chunk_bytes : int, optional
+        Size in bytes of the largest chunk that will be read
+
+    Returns:
+    --------
+    h5py.File
+        File opened in read mode
+    """
+    return h5py.File(
+        file_path,
+        "r",
+        rdcc_nbytes=max(64 * 1024**2, chunk_bytes or 0),
+        rdcc_nslots=100003,
+        rdcc_w0=0.75,
+    )
+
+
+def _fits(out, shape, dtype):
+    return (
+        isinstance(out, np.ndarray)
+        and out.shape == tuple(shape)
+        and out.dtype == dtype
+        and out.flags.c_contiguous
+        and out.flags.writeable
+    )
+
+
+def read_quantized_dataset(dset, max_workers=None, out=None):
+    """
+    Read a quantized dataset chunk by chunk, dequantizing each chunk on a
+    worker thread while the next chunk is being read from the file.
+
+    Parameters:
+    -----------
+    dset : h5py.Dataset
+        Dataset written by the FFMPEG filter with quantization attributes
+    max_workers : int, optional
+        Number of dequantization threads (default: ThreadPoolExecutor default)
+    out : numpy.ndarray, optional
+        Preallocated array to read into; used only if its shape and dtype
+        match the dequantized data
+
+    Returns:
+    --------
+    numpy.ndarray
+        Dequantized data in the original dtype
+    """
+    from .patches import _get_quant_meta, _apply_dequant, _original_dataset_getitem
+
+    meta = _get_quant_meta(dset)
+    if meta is None or dset.chunks is None:
+        return dset[()]
+
+    if not _fits(out, dset.shape, meta[-1]):
+        out = np.empty(dset.shape, dtype=meta[-1])
+
+    def dequant_into(sel, raw):
+        _apply_dequant(raw, meta, out=out[sel])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(dequant_into, sel, _original_dataset_getitem(dset, sel))
+            for sel in dset.iter_chunks()
+        ]
+        for future in futures:
+            future.result()
+
+    return out
+
+
+def compress_and_decompress(data, compression_options, dataset_name="data", out=None):
     """
     Compress and decompress data using the FFMPEG HDF5 filter.
 
@@ -109,6 +269,9 @@ def compress_and_decompress(data, compression_options, dataset_name="data"):
         Compression options for h5py.create_dataset
     dataset_name : str
         Name of the dataset in the HDF5 file
+    out : numpy.ndarray, optional
+        Preallocated array to decompress into, so repeated calls can reuse
+        one buffer; ignored unless its shape and dtype match the data
 
     Returns:
     --------
@@ -123,7 +286,12 @@ def compress_and_decompress(data, compression_options, dataset_name="data"):
         # Write data with compression
         start_time = time.time()
         with h5py.File(temp_file, "w") as f:
-            f.create_dataset(dataset_name, data=data, **compression_options)
+            dset = f.create_dataset(dataset_name, data=data, **compression_options)
+            # Size the read cache to one chunk, not the whole volume;
+            # contiguous datasets don't go through the chunk cache at all
+            chunk_bytes = (
+                int(np.prod(dset.chunks)) * dset.dtype.itemsize if dset.chunks else None
+            )
         enc_time = time.time() - start_time
 
         # Get compressed file size
@@ -131,8 +299,17 @@ def compress_and_decompress(data, compression_options, dataset_name="data"):
 
         # Read back the data
         start_time = time.time()
-        with h5py.File(temp_file, "r") as f:
-            decompressed_data = f[dataset_name][:]
+        with open_h5_for_read(temp_file, chunk_bytes=chunk_bytes) as f:
+            dset = f[dataset_name]
+            if "bit" in dset.attrs:
+                decompressed_data = read_quantized_dataset(dset, out=out)
+            else:
+                decompressed_data = (
+                    out
+                    if _fits(out, dset.shape, dset.dtype)
+                    else np.empty(dset.shape, dtype=dset.dtype)
+                )
+                dset.read_direct(decompressed_data)
         dec_time = time.time() - start_time
 
         # Calculate compression ratio
@@ -157,42 +334,41 @@ def generate_3d_sample_vol(
     if dtype not in [np.uint8, np.uint16]:
         raise ValueError("Only np.uint8 and np.uint16 data types are supported")
 
-    if seed is not None:
-        np.random.seed(seed)
-
     if pattern == "random":
-        if dtype == np.uint8:
-            return np.random.randint(0, 256, (depth, height, width), dtype=dtype)
-        else:
-            return np.random.randint(0, 65536, (depth, height, width), dtype=dtype)
+        # Generator.integers fills the target dtype directly and is several
+        # times faster than the legacy global-state randint for uint8
+        rng = np.random.default_rng(seed)
+        return rng.integers(
+            0, np.iinfo(dtype).max, (depth, height, width), dtype=dtype, endpoint=True
+        )
 
     elif pattern == "gradient":
-        x = np.linspace(0, 1, width)
-        y = np.linspace(0, 1, height)
-        z = np.linspace(0, 1, depth)
-        xx, yy, zz = np.meshgrid(x, y, z, indexing="ij")
-        data = (xx + yy + zz) / 3
-
-        if dtype == np.uint8:
-            data = (data * 255).astype(dtype)
-        else:
-            data = (data * 65535).astype(dtype)
-
-        return np.transpose(data, [2, 1, 0])
+        max_val = 255 if dtype == np.uint8 else 65535
+        x = np.linspace(0, 1, width, dtype=np.float32)
+        y = np.linspace(0, 1, height, dtype=np.float32)
+        z = np.linspace(0, 1, depth, dtype=np.float32)
+
+        # Broadcast straight into (depth, height, width) order
+        data = np.empty((depth, height, width), dtype=np.float32)
+        np.add(z[:, None, None], y[None, :, None], out=data)
+        data += x[None, None, :]
+
+        # Scale and narrow to the output dtype in one pass
+        return np.multiply(
+            data,
+            max_val / 3,
+            out=np.empty(data.shape, dtype=dtype),
+            casting="unsafe",
+        )
 
     elif pattern == "stripes":
+        max_val = 255 if dtype == np.uint8 else 65535
         x = np.arange(width)
-        data = np.sin(x * 8 * np.pi / width)
-        data = np.tile(data, (depth, height, 1))
-
-        data = (data + 1) / 2
-
-        if dtype == np.uint8:
-            data = (data * 255).astype(dtype)
-        else:
-            data = (data * 65535).astype(dtype)
+        row = np.sin(x * 8 * np.pi / width)
+        row = ((row + 1) / 2 * max_val).astype(dtype)
 
-        return data
+        # Only the single row is computed; replicate it in the output dtype
+        return np.ascontiguousarray(np.broadcast_to(row, (depth, height, width)))
 
     else:
         raise ValueError(f"Unknown pattern: {pattern}")
@@ -1,26 +1,139 @@
 import os
 import sys
 import platform
-import glob
+import re
+import shutil
 import subprocess
+import functools
+import json
+import logging
 from setuptools import setup, Extension, find_packages
 from setuptools.command.build_ext import build_ext
 
 __VERSION__ = "2.4.0"
 
-def is_building_sdist():
-    return "sdist" in sys.argv or "egg_info" in sys.argv
+# Build diagnostics are debug messages, shown only with H5FFMPEG_VERBOSE=1 or
+# -v/--verbose; errors and warnings are still printed unconditionally
+log = logging.getLogger("h5ffmpeg.setup")
+log.propagate = False
+if os.environ.get("H5FFMPEG_VERBOSE") or not {"-v", "--verbose"}.isdisjoint(
+    sys.argv[1:]
+):
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_handler)
+    log.setLevel(logging.DEBUG)
+else:
+    log.addHandler(logging.NullHandler())
+
+# Invocations that only need package metadata or touch no compiled code
+# (pip's metadata hooks, sdist, check/clean, help/queries), so the native
+# dependency discovery below can be skipped
+METADATA_ONLY_ARGS = {
+    "sdist",
+    "egg_info",
+    "dist_info",
+    "check",
+    "clean",
+    "--help",
+    "-h",
+    "--help-commands",
+    "--name",
+    "--version",
+}
+
+
+def is_metadata_only():
+    return not METADATA_ONLY_ARGS.isdisjoint(sys.argv[1:])
+
+
+@functools.lru_cache(maxsize=None)
+def list_dir(dir_path):
+    """Names in dir_path, read once per directory (empty if it doesn't exist).
+    Names are normcase'd so lookups stay case-insensitive on Windows."""
+    try:
+        with os.scandir(dir_path) as entries:
+            return frozenset(os.path.normcase(entry.name) for entry in entries)
+    except OSError:
+        return frozenset()
+
+
+PKG_CONFIG = shutil.which("pkg-config")
+
+# platform.system()/machine() can shell out to uname; resolve them once
+SYSTEM = platform.system().lower()
+MACHINE = platform.machine().lower()
+
+# Per-platform (shared suffix, static suffix, prefix) of library file names
+LIB_NAMING = {
+    "windows": (".dll", ".lib", ""),
+    "darwin": (".dylib", ".a", "lib"),
+}
+DEFAULT_LIB_NAMING = (".so", ".a", "lib")
+
+# Per-platform (include dirs, library dirs) probed for HDF5 when neither
+# HDF5_ROOT nor pkg-config locate it
+HDF5_FALLBACK_DIRS = {
+    "linux": (
+        [
+            "/usr/include/hdf5/serial",
+            "/usr/include/hdf5",
+            "/usr/include",
+            "/usr/local/include",
+        ],
+        [
+            "/usr/lib/x86_64-linux-gnu/hdf5/serial",
+            "/usr/lib/x86_64-linux-gnu",
+            "/usr/lib64",
+            "/usr/lib",
+            "/usr/local/lib",
+        ],
+    ),
+    "darwin": (
+        [
+            "/opt/homebrew/include",
+            "/usr/local/include",
+            "/usr/local/opt/hdf5/include",
+        ],
+        [
+            "/opt/homebrew/lib",
+            "/usr/local/lib",
+            "/usr/local/opt/hdf5/lib",
+        ],
+    ),
+    "windows": (
+        ["C:\\Program Files\\HDF5\\include", "C:\\HDF5\\include"],
+        ["C:\\Program Files\\HDF5\\lib", "C:\\HDF5\\lib"],
+    ),
+}
+
+
+def pkg_config_flags(args, env=None):
+    """Run pkg-config once and return its flags, or None if it is missing,
+    fails or hangs."""
+    if not PKG_CONFIG:
+        return None
+    try:
+        output = subprocess.run(
+            [PKG_CONFIG] + args,
+            capture_output=True,
+            timeout=3,
+            check=True,
+            env=env,
+        ).stdout
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        return None
+    return output.decode("ascii", "replace").split()
 
 
 def get_ffmpeg_root():
     if "FFMPEG_ROOT" in os.environ:
         return os.environ["FFMPEG_ROOT"]
 
-    system = platform.system().lower()
-    if system == "windows":
+    if SYSTEM == "windows":
         home = os.environ.get("HOME", "D:\\a")
         return os.path.join(home, "ffmpeg_build")
-    elif system == "darwin":
+    elif SYSTEM == "darwin":
         home = os.path.expanduser("~")
         return os.path.join(home, "ffmpeg")
     else:
@@ -31,14 +144,13 @@ def get_hdf5_root():
     if "HDF5_ROOT" in os.environ:
         return os.environ["HDF5_ROOT"]
 
-    system = platform.system().lower()
-    if system == "windows":
+    if SYSTEM == "windows":
         home = os.environ.get("HOME", "D:\\a")
         hdf5_dir = os.path.join(home, "ffmpeg_build")
 
         if os.path.exists(os.path.join(hdf5_dir, "include", "hdf5.h")):
             return hdf5_dir
-    elif system == "darwin":
+    elif SYSTEM == "darwin":
         possible_paths = [
             "/opt/homebrew/opt/hdf5",
             "/usr/local/opt/hdf5",
@@ -62,34 +174,38 @@ def get_hdf5_root():
 
 def check_hdf5_installation():
     """Check what HDF5 files are actually available"""
+    # Purely diagnostic: only list directories when verbose output is on
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+
     if HDF5_ROOT:
         lib_dir = os.path.join(HDF5_ROOT, "lib")
         bin_dir = os.path.join(HDF5_ROOT, "bin")
 
-        print(f"\n=== HDF5 Installation Check ===")
-        print(f"HDF5_ROOT: {HDF5_ROOT}")
+        lines = ["\n=== HDF5 Installation Check ===", f"HDF5_ROOT: {HDF5_ROOT}"]
 
         if os.path.exists(lib_dir):
-            print(f"\nLibrary files in {lib_dir}:")
-            lib_files = [f for f in os.listdir(lib_dir) if f.endswith(".lib")]
-            for lib_file in sorted(lib_files):
-                print(f"  {lib_file}")
+            lines.append(f"\nLibrary files in {lib_dir}:")
+            with os.scandir(lib_dir) as entries:
+                for lib_file in sorted(e.name for e in entries if e.name.endswith(".lib")):
+                    lines.append(f"  {lib_file}")
         else:
-            print(f"Library directory not found: {lib_dir}")
+            lines.append(f"Library directory not found: {lib_dir}")
 
         if os.path.exists(bin_dir):
-            print(f"\nDLL files in {bin_dir}:")
-            dll_files = [f for f in os.listdir(bin_dir) if f.endswith(".dll")]
-            for dll_file in sorted(dll_files):
-                print(f"  {dll_file}")
+            lines.append(f"\nDLL files in {bin_dir}:")
+            with os.scandir(bin_dir) as entries:
+                for dll_file in sorted(e.name for e in entries if e.name.endswith(".dll")):
+                    lines.append(f"  {dll_file}")
         else:
-            print(f"Binary directory not found: {bin_dir}")
+            lines.append(f"Binary directory not found: {bin_dir}")
 
-        print("=================================\n")
+        lines.append("=================================\n")
+        log.debug("\n".join(lines))
 
 
-if is_building_sdist():
-    print("Building source distribution - skipping FFmpeg/HDF5 dependency checks")
+if is_metadata_only():
+    log.debug("Metadata-only build - skipping FFmpeg/HDF5 dependency checks")
 
     ffmpeg_module = Extension(
         "h5ffmpeg._ffmpeg_filter",
@@ -110,10 +226,16 @@ else:
     HDF5_ROOT = get_hdf5_root()
 
     src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
-    print(f"Source directory: {src_dir}")
-    print(f"FFMPEG_ROOT: {FFMPEG_ROOT}")
-    print(f"HDF5_ROOT: {HDF5_ROOT}")
-    print(f"Building for: {platform.system()} {platform.machine()}")
+    log.debug(
+        "\n".join(
+            [
+                f"Source directory: {src_dir}",
+                f"FFMPEG_ROOT: {FFMPEG_ROOT}",
+                f"HDF5_ROOT: {HDF5_ROOT}",
+                f"Building for: {SYSTEM} {MACHINE}",
+            ]
+        )
+    )
 
     required_files = [
         os.path.join(src_dir, "ffmpeg_h5filter.h"),
@@ -124,9 +246,10 @@ else:
         os.path.join(src_dir, "ffmpeg_native.c"),
     ]
 
+    src_files = list_dir(src_dir)
     for file_path in required_files:
-        if os.path.exists(file_path):
-            print(f"Found required file: {file_path}")
+        if os.path.normcase(os.path.basename(file_path)) in src_files:
+            log.debug(f"Found required file: {file_path}")
         else:
             print(f"ERROR: Required file not found: {file_path}")
             sys.exit(1)
@@ -141,67 +264,59 @@ else:
     ffmpeg_include = os.path.join(FFMPEG_ROOT, "include")
     ffmpeg_lib = os.path.join(FFMPEG_ROOT, "lib")
 
-    if not os.path.exists(ffmpeg_include):
+    # One listing of FFMPEG_ROOT answers both checks (and the error output)
+    ffmpeg_root_files = list_dir(FFMPEG_ROOT)
+
+    if "include" not in ffmpeg_root_files:
         print(f"ERROR: FFmpeg include directory not found: {ffmpeg_include}")
-        print(
-            f"Contents of FFMPEG_ROOT: {os.listdir(FFMPEG_ROOT) if os.path.exists(FFMPEG_ROOT) else 'Directory does not exist'}"
-        )
+        print(f"Contents of FFMPEG_ROOT: {sorted(ffmpeg_root_files)}")
         sys.exit(1)
 
-    if not os.path.exists(ffmpeg_lib):
+    if "lib" not in ffmpeg_root_files:
         print(f"ERROR: FFmpeg lib directory not found: {ffmpeg_lib}")
-        print(
-            f"Contents of FFMPEG_ROOT: {os.listdir(FFMPEG_ROOT) if os.path.exists(FFMPEG_ROOT) else 'Directory does not exist'}"
-        )
+        print(f"Contents of FFMPEG_ROOT: {sorted(ffmpeg_root_files)}")
         sys.exit(1)
 
-    system = platform.system().lower()
-    machine = platform.machine().lower()
+    system = SYSTEM
+    machine = MACHINE
 
     include_dirs = [src_dir, ffmpeg_include]
 
     library_dirs = [ffmpeg_lib]
 
+    shared_lib_ext, static_lib_ext, lib_prefix = LIB_NAMING.get(
+        system, DEFAULT_LIB_NAMING
+    )
     if system == "windows":
-        shared_lib_ext = ".dll"
-        static_lib_ext = ".lib"
-        lib_prefix = ""
         ffmpeg_bin = os.path.join(FFMPEG_ROOT, "bin")
         if os.path.exists(ffmpeg_bin):
             library_dirs.append(ffmpeg_bin)
-    elif system == "darwin":
-        shared_lib_ext = ".dylib"
-        static_lib_ext = ".a"
-        lib_prefix = "lib"
-    else:
-        shared_lib_ext = ".so"
-        static_lib_ext = ".a"
-        lib_prefix = "lib"
-
-    def find_library(
-        lib_name,
-        search_dirs,
-        prefix=lib_prefix,
-        extensions=[shared_lib_ext, static_lib_ext],
-    ):
+
+    def find_library(lib_name, search_dirs):
+        # Build the candidate file names (and the DLL pattern) once per
+        # library instead of once per directory
+        candidates = tuple(
+            f"{lib_prefix}{lib_name}{ext}" for ext in (shared_lib_ext, static_lib_ext)
+        )
+        if system == "windows":
+            dll_pattern = re.compile(rf"(lib)?{re.escape(lib_name)}.*\.dll")
+
         for dir_path in search_dirs:
-            if not os.path.exists(dir_path):
+            dir_files = list_dir(dir_path)
+            if not dir_files:
                 continue
 
-            for ext in extensions:
-                lib_path = os.path.join(dir_path, f"{prefix}{lib_name}{ext}")
-                if os.path.exists(lib_path):
-                    print(f"Found library: {lib_path}")
+            for lib_file in candidates:
+                if os.path.normcase(lib_file) in dir_files:
+                    lib_path = os.path.join(dir_path, lib_file)
+                    log.debug(f"Found library: {lib_path}")
                     return dir_path
 
             if system == "windows":
-                dll_patterns = [f"{lib_name}*.dll", f"lib{lib_name}*.dll"]
-
-                for pattern in dll_patterns:
-                    dll_files = glob.glob(os.path.join(dir_path, pattern))
-                    if dll_files:
-                        print(f"Found Windows DLL: {dll_files[0]}")
-                        return dir_path
+                dll_files = sorted(f for f in dir_files if dll_pattern.fullmatch(f))
+                if dll_files:
+                    log.debug(f"Found Windows DLL: {os.path.join(dir_path, dll_files[0])}")
+                    return dir_path
 
         return None
 
@@ -214,7 +329,7 @@ else:
                 if os.path.exists(os.path.join(hdf5_include_dir, "hdf5.h")):
                     include_dirs.append(hdf5_include_dir)
                     library_dirs.append(hdf5_library_dir)
-                    print(
+                    log.debug(
                         f"Using HDF5 from HDF5_ROOT: include={hdf5_include_dir}, lib={hdf5_library_dir}"
                     )
                     return True
@@ -225,85 +340,40 @@ else:
                     f"WARNING: HDF5_ROOT directories don't exist: include={hdf5_include_dir}, lib={hdf5_library_dir}"
                 )
 
-        try:
-            hdf5_cflags = subprocess.check_output(
-                ["pkg-config", "--cflags", "hdf5"],
-                universal_newlines=True,
-                stderr=subprocess.DEVNULL,
-            ).strip()
-            hdf5_libs = subprocess.check_output(
-                ["pkg-config", "--libs", "hdf5"],
-                universal_newlines=True,
-                stderr=subprocess.DEVNULL,
-            ).strip()
-
-            print(f"pkg-config HDF5 cflags: {hdf5_cflags}")
-            print(f"pkg-config HDF5 libs: {hdf5_libs}")
+        hdf5_flags = pkg_config_flags(["--cflags", "--libs", "hdf5"])
+        if hdf5_flags is not None:
+            log.debug(f"pkg-config HDF5 flags: {' '.join(hdf5_flags)}")
 
             hdf5_found = False
-            for flag in hdf5_cflags.split():
+            for flag in hdf5_flags:
                 if flag.startswith("-I"):
                     include_dir = flag[2:]
                     if os.path.exists(os.path.join(include_dir, "hdf5.h")):
                         include_dirs.append(include_dir)
                         hdf5_found = True
-                        print(f"Added HDF5 include dir from pkg-config: {include_dir}")
-
-            for flag in hdf5_libs.split():
-                if flag.startswith("-L"):
+                        log.debug(f"Added HDF5 include dir from pkg-config: {include_dir}")
+                elif flag.startswith("-L"):
                     lib_dir = flag[2:]
                     if os.path.exists(lib_dir):
                         library_dirs.append(lib_dir)
-                        print(f"Added HDF5 library dir from pkg-config: {lib_dir}")
+                        log.debug(f"Added HDF5 library dir from pkg-config: {lib_dir}")
 
             if hdf5_found:
-                print("Successfully configured HDF5 using pkg-config")
+                log.debug("Successfully configured HDF5 using pkg-config")
                 return True
 
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            print("pkg-config not available or could not find HDF5")
-
-        potential_include_dirs = []
-        potential_library_dirs = []
+        log.debug("pkg-config not available or could not find HDF5")
 
-        if system == "linux":
-            potential_include_dirs = [
-                "/usr/include/hdf5/serial",
-                "/usr/include/hdf5",
-                "/usr/include",
-                "/usr/local/include",
-            ]
-            potential_library_dirs = [
-                "/usr/lib/x86_64-linux-gnu/hdf5/serial",
-                "/usr/lib/x86_64-linux-gnu",
-                "/usr/lib64",
-                "/usr/lib",
-                "/usr/local/lib",
-            ]
-        elif system == "darwin":
-            potential_include_dirs = [
-                "/opt/homebrew/include",
-                "/usr/local/include",
-                "/usr/local/opt/hdf5/include",
-            ]
-            potential_library_dirs = [
-                "/opt/homebrew/lib",
-                "/usr/local/lib",
-                "/usr/local/opt/hdf5/lib",
-            ]
-        elif system == "windows":
-            potential_include_dirs = [
-                "C:\\Program Files\\HDF5\\include",
-                "C:\\HDF5\\include",
-            ]
-            potential_library_dirs = ["C:\\Program Files\\HDF5\\lib", "C:\\HDF5\\lib"]
+        potential_include_dirs, potential_library_dirs = HDF5_FALLBACK_DIRS.get(
+            system, ([], [])
+        )
 
         hdf5_include_found = False
         for dir_path in potential_include_dirs:
             if os.path.exists(os.path.join(dir_path, "hdf5.h")):
                 include_dirs.append(dir_path)
                 hdf5_include_found = True
-                print(f"Found HDF5 header at: {os.path.join(dir_path, 'hdf5.h')}")
+                log.debug(f"Found HDF5 header at: {os.path.join(dir_path, 'hdf5.h')}")
                 break
 
         hdf5_lib_found = False
@@ -322,21 +392,78 @@ else:
 
         return True
 
-    configure_hdf5()
+    def load_discovery_cache(cache_file, key):
+        """Return cached (include_dirs, library_dirs) if they match this
+        configuration and the cached HDF5 headers are still in place."""
+        if os.environ.get("H5FFMPEG_REDISCOVER") == "1":
+            return None
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get("key") != key or not any(
+            os.path.exists(os.path.join(d, "hdf5.h")) for d in cached["include_dirs"]
+        ):
+            return None
+        return cached["include_dirs"], cached["library_dirs"]
+
+    def save_discovery_cache(cache_file, key):
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "key": key,
+                        "include_dirs": include_dirs,
+                        "library_dirs": library_dirs,
+                    },
+                    f,
+                )
+        except OSError as e:
+            print(f"WARNING: Could not write discovery cache {cache_file}: {e}")
+
+    # Reuse the resolved search paths across setup.py invocations (sdist,
+    # wheel, build_ext, editable re-installs) while the inputs are unchanged
+    discovery_cache = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "build", ".h5ffmpeg_discover.json"
+    )
+    discovery_key = [
+        system,
+        machine,
+        src_dir,
+        FFMPEG_ROOT,
+        HDF5_ROOT,
+        os.environ.get("PKG_CONFIG_PATH"),
+    ]
+    cached_dirs = load_discovery_cache(discovery_cache, discovery_key)
+    if cached_dirs:
+        include_dirs[:], library_dirs[:] = cached_dirs
+        log.debug(f"Using cached dependency paths from {discovery_cache}")
+    else:
+        configure_hdf5()
+
+        # HDF5_ROOT, pkg-config and the fallback scan can add the same
+        # directory more than once; keep the first occurrence so -I/-L/rpath
+        # stay minimal
+        include_dirs[:] = dict.fromkeys(include_dirs)
+        library_dirs[:] = dict.fromkeys(library_dirs)
+        save_discovery_cache(discovery_cache, discovery_key)
+
     check_hdf5_installation()
 
     ffmpeg_libs = ["avcodec", "avutil", "avformat", "swscale"]
     missing_ffmpeg_libs = []
 
-    print("Checking FFmpeg headers...")
+    log.debug("Checking FFmpeg headers...")
     for lib in ffmpeg_libs:
         header_path = os.path.join(FFMPEG_ROOT, "include", f"lib{lib}", f"{lib}.h")
         if os.path.exists(header_path):
-            print(f"Found FFmpeg header: {header_path}")
+            log.debug(f"Found FFmpeg header: {header_path}")
         else:
             print(f"WARNING: FFmpeg header not found: {header_path}")
 
-    print("Checking FFmpeg libraries...")
+    log.debug("Checking FFmpeg libraries...")
     for lib in ffmpeg_libs:
         lib_found = find_library(lib, library_dirs)
         if not lib_found:
@@ -367,12 +494,32 @@ else:
     extra_link_args = []
 
     if system == "linux":
-        extra_compile_args.extend(["-std=c99", "-fPIC", "-D_POSIX_C_SOURCE=200809L"])
-        extra_link_args.extend(["-Wl,--no-as-needed"])
-        for dir_path in library_dirs:
-            extra_link_args.append(f"-Wl,-rpath,{dir_path}")
+        extra_compile_args.extend(
+            [
+                "-std=c99",
+                "-fPIC",
+                "-D_POSIX_C_SOURCE=200809L",
+                "-O3",
+                "-fvisibility=hidden",
+            ]
+        )
+        # The loader already searches the system directories, so only
+        # $ORIGIN and non-default install prefixes need an rpath entry
+        system_lib_dirs = {
+            "/lib",
+            "/lib64",
+            "/usr/lib",
+            "/usr/lib64",
+            f"/usr/lib/{machine}-linux-gnu",
+        }
+        rpath = ["$ORIGIN"] + [
+            dir_path
+            for dir_path in library_dirs
+            if os.path.normpath(dir_path) not in system_lib_dirs
+        ]
+        extra_link_args.append(f"-Wl,-rpath,{':'.join(rpath)}")
     elif system == "darwin":
-        extra_compile_args.extend(["-std=c99", "-fPIC"])
+        extra_compile_args.extend(["-std=c99", "-fPIC", "-O3", "-fvisibility=hidden"])
         extra_link_args.extend(
             [
                 "-Wl,-rpath,@loader_path",
@@ -385,12 +532,101 @@ else:
         extra_compile_args.extend(
             [
                 "/std:c11",
+                "/O2",
                 "-D_CRT_SECURE_NO_WARNINGS",
                 "-DH5_BUILT_AS_DYNAMIC_LIB",
                 "-D_HDF5USEDLL_",
             ]
         )
 
+    # Link-time optimization lets calls between the five sources inline
+    if os.environ.get("DEBUG") != "1":
+        if system == "windows":
+            extra_compile_args.append("/GL")
+            extra_link_args.append("/LTCG")
+        elif system == "darwin":
+            extra_compile_args.append("-flto")
+            extra_link_args.append("-flto")
+        else:
+            extra_compile_args.append("-flto=auto")
+            extra_link_args.append("-flto=auto")
+
+    # Tune for the build machine only on request, so wheels stay portable
+    if os.environ.get("H5FFMPEG_NATIVE") == "1":
+        if system == "windows":
+            extra_compile_args.append("/arch:AVX2")
+        else:
+            extra_compile_args.append("-march=native")
+
+    # Profile-guided optimization: build with H5FFMPEG_PGO=generate, run a
+    # representative workload, then rebuild with H5FFMPEG_PGO=use
+    pgo_mode = os.environ.get("H5FFMPEG_PGO")
+    if pgo_mode in ("generate", "use"):
+        pgo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "build", "pgo")
+        if system == "windows":
+            if "/GL" not in extra_compile_args:
+                extra_compile_args.append("/GL")
+            os.makedirs(pgo_dir, exist_ok=True)
+            extra_link_args = [arg for arg in extra_link_args if arg != "/LTCG"]
+            extra_link_args.extend(
+                [
+                    "/LTCG:PGINSTRUMENT" if pgo_mode == "generate" else "/LTCG:PGOPTIMIZE",
+                    f"/PGD:{os.path.join(pgo_dir, 'h5ffmpeg.pgd')}",
+                ]
+            )
+        elif pgo_mode == "generate":
+            extra_compile_args.append(f"-fprofile-generate={pgo_dir}")
+            extra_link_args.append(f"-fprofile-generate={pgo_dir}")
+        else:
+            extra_compile_args.extend([f"-fprofile-use={pgo_dir}", "-fprofile-correction"])
+            extra_link_args.append(f"-fprofile-use={pgo_dir}")
+        log.debug(f"Profile-guided optimization: {pgo_mode} ({pgo_dir})")
+
+    # Optionally link FFmpeg's static archives and let the linker drop every
+    # section the filter doesn't reference
+    extra_objects = []
+    static_ffmpeg = (
+        os.environ.get("H5FFMPEG_STATIC_FFMPEG") == "1" and system != "windows"
+    )
+    if static_ffmpeg:
+        static_libs = [
+            os.path.join(ffmpeg_lib, f"lib{lib}.a")
+            for lib in ["avformat", "avcodec", "swscale", "avutil"]
+        ]
+        if all(os.path.exists(lib_path) for lib_path in static_libs):
+            extra_objects = static_libs
+            libraries = [lib for lib in libraries if lib not in ffmpeg_libs]
+
+            # The archives still need the codec libraries FFmpeg was built with
+            pkg_config_path = os.pathsep.join(
+                filter(
+                    None,
+                    [
+                        os.path.join(ffmpeg_lib, "pkgconfig"),
+                        os.environ.get("PKG_CONFIG_PATH"),
+                    ],
+                )
+            )
+            static_flags = pkg_config_flags(
+                ["--static", "--libs"] + [f"lib{lib}" for lib in ffmpeg_libs],
+                env=dict(os.environ, PKG_CONFIG_PATH=pkg_config_path),
+            )
+            extra_link_args.extend(
+                flag
+                for flag in static_flags or []
+                if flag not in [f"-l{lib}" for lib in ffmpeg_libs]
+            )
+
+            extra_compile_args.extend(["-ffunction-sections", "-fdata-sections"])
+            if system == "darwin":
+                extra_link_args.append("-Wl,-dead_strip")
+            else:
+                extra_link_args.append("-Wl,--gc-sections")
+            log.debug(f"Linking FFmpeg statically: {static_libs}")
+        else:
+            print("WARNING: FFmpeg static libraries not found, linking shared")
+            static_ffmpeg = False
+
     ffmpeg_module = Extension(
         "h5ffmpeg._ffmpeg_filter",
         sources=[
@@ -403,46 +639,147 @@ else:
         include_dirs=include_dirs,
         library_dirs=library_dirs,
         libraries=libraries,
+        extra_objects=extra_objects,
         extra_compile_args=extra_compile_args,
         extra_link_args=extra_link_args,
+        depends=[
+            os.path.join("src", "ffmpeg_h5filter.h"),
+            os.path.join("src", "ffmpeg_utils.h"),
+        ],
     )
 
-    class CustomBuildExt(build_ext):
-        def finalize_options(self):
-            build_ext.finalize_options(self)
-            import builtins
+    def lazy_compile(compile_fn, compiler, depends, jobs=1, force=False):
+        """Wrap compiler.compile so only sources newer than their object file
+        (or than any shared header) are recompiled, up to `jobs` at a time."""
 
-            builtins.__NUMPY_SETUP__ = False
-            import numpy
+        def compile(sources, output_dir=None, *args, **kwargs):
+            objects = compiler.object_filenames(
+                sources, output_dir=output_dir or compiler.output_dir or ""
+            )
+            newest_header = max(
+                (os.path.getmtime(dep) for dep in depends if os.path.exists(dep)),
+                default=0,
+            )
+            stale = [
+                src
+                for src, obj in zip(sources, objects)
+                if force
+                or not os.path.exists(obj)
+                or os.path.getmtime(obj) < max(os.path.getmtime(src), newest_header)
+            ]
+            if len(stale) < len(sources):
+                log.debug(f"Skipping {len(sources) - len(stale)} up-to-date object(s)")
+            if len(stale) > 1 and jobs > 1:
+                from concurrent.futures import ThreadPoolExecutor
+
+                # MSVC locates its toolchain lazily on first compile
+                if not getattr(compiler, "initialized", True):
+                    compiler.initialize()
+                with ThreadPoolExecutor(min(jobs, len(stale))) as pool:
+                    for future in [
+                        pool.submit(compile_fn, [src], output_dir, *args, **kwargs)
+                        for src in stale
+                    ]:
+                        future.result()
+            elif stale:
+                compile_fn(stale, output_dir, *args, **kwargs)
+            return objects
+
+        return compile
+
+    @functools.lru_cache(maxsize=None)
+    def includes_numpy(source):
+        with open(source, "r", encoding="utf-8", errors="replace") as f:
+            return "numpy/" in f.read()
+
+    class CustomBuildExt(build_ext):
+        def build_extensions(self):
+            # An explicit `build_ext -j N` wins over the environment default
+            jobs = self.parallel or int(
+                os.environ.get("H5FFMPEG_BUILD_JOBS", os.cpu_count() or 1)
+            )
+            if jobs is True:
+                jobs = os.cpu_count() or 1
+            # Objects from the other PGO phase are not reusable
+            if pgo_mode in ("generate", "use"):
+                self.force = True
+            log.debug(f"Compiling with up to {jobs} parallel job(s)")
+
+            # Route compiles (not links) through ccache when it's installed;
+            # compare compilers by content so the cache survives path changes
+            self.ccache = None
+            ccache = shutil.which("ccache")
+            compiler_so = getattr(self.compiler, "compiler_so", None)
+            if (
+                ccache
+                and os.environ.get("USE_CCACHE") != "0"
+                and compiler_so
+                and os.path.basename(compiler_so[0]) != "ccache"
+            ):
+                os.environ.setdefault("CCACHE_COMPILERCHECK", "content")
+                self.compiler.set_executable("compiler_so", [ccache] + compiler_so)
+                self.ccache = ccache
+                log.debug(f"Using ccache: {ccache}")
+
+            self.compiler.compile = lazy_compile(
+                self.compiler.compile,
+                self.compiler,
+                ffmpeg_module.depends,
+                jobs=jobs,
+                force=self.force,
+            )
+            super().build_extensions()
 
-            self.include_dirs.append(numpy.get_include())
-            print(f"Added numpy include directory: {numpy.get_include()}")
+            # Cache statistics let CI check that restored ccache dirs are hit
+            if self.ccache and log.isEnabledFor(logging.DEBUG):
+                sys.stdout.flush()
+                subprocess.run([self.ccache, "-s"], check=False)
 
         def build_extension(self, ext):
-            print(f"\n{'='*50}")
-            print(f"Building extension: {ext.name}")
-            print(f"{'='*50}")
-            print(f"Sources: {ext.sources}")
-            print(f"Include dirs: {ext.include_dirs}")
-            print(f"Library dirs: {ext.library_dirs}")
-            print(f"Libraries: {ext.libraries}")
-            print(f"Extra compile args: {ext.extra_compile_args}")
-            print(f"Extra link args: {ext.extra_link_args}")
-            print(f"{'='*50}\n")
+            # Only pay for the numpy import when a source actually needs it
+            if any(includes_numpy(src) for src in ext.sources):
+                import builtins
+
+                builtins.__NUMPY_SETUP__ = False
+                import numpy
+
+                ext.include_dirs.append(numpy.get_include())
+                log.debug(f"Added numpy include directory: {numpy.get_include()}")
+
+            log.debug(
+                "\n".join(
+                    [
+                        f"\n{'='*50}",
+                        f"Building extension: {ext.name}",
+                        f"{'='*50}",
+                        f"Sources: {ext.sources}",
+                        f"Include dirs: {ext.include_dirs}",
+                        f"Library dirs: {ext.library_dirs}",
+                        f"Libraries: {ext.libraries}",
+                        f"Extra compile args: {ext.extra_compile_args}",
+                        f"Extra link args: {ext.extra_link_args}",
+                        f"{'='*50}\n",
+                    ]
+                )
+            )
 
             super().build_extension(ext)
 
             output_dir = os.path.abspath(
                 os.path.dirname(self.get_ext_fullpath(ext.name))
             )
-            print(f"Extension built and saved to: {output_dir}")
+            log.debug(f"Extension built and saved to: {output_dir}")
 
-            system = platform.system().lower()
             if system != "windows":
                 lib_file = self.get_ext_fullpath(ext.name)
                 if os.path.exists(lib_file):
                     os.chmod(lib_file, 0o755)
-                    print(f"Set executable permission on {lib_file}")
+                    log.debug(f"Set executable permission on {lib_file}")
+
+                    if static_ffmpeg and shutil.which("strip"):
+                        strip_flag = "-x" if system == "darwin" else "--strip-unneeded"
+                        subprocess.run(["strip", strip_flag, lib_file], check=False)
+                        log.debug(f"Stripped {lib_file}")
 
 
 def write_version_py(version, filename="h5ffmpeg/_version.py"):
@@ -451,7 +788,7 @@ def write_version_py(version, filename="h5ffmpeg/_version.py"):
         os.makedirs(os.path.dirname(filename), exist_ok=True)
         with open(filename, "w") as f:
             f.write(f"__version__ = '{version}'\n")
-        print(f"Version file written: {filename}")
+        log.debug(f"Version file written: {filename}")
     except Exception as e:
         print(f"WARNING: Could not write version file {filename}: {e}")
 
@@ -479,13 +816,14 @@ setup(
         "h5py>=3.8.0",
         "numpy>=1.15.0",
         "colorama>=0.4.6",
-        "tabulate>=0.9.0",
         "matplotlib>=3.10.3",
         "scikit-image>=0.25.2",
     ],
     extras_require={
         "nvidia": ["cupy-cuda11x"],
         "intel": ["intel-openmp"],
+        "numexpr": ["numexpr>=2.8.0"],
+        "numba": ["numba>=0.57"],
     },
     python_requires=">=3.10,<4.0",
     cmdclass={"build_ext": CustomBuildExt},
@@ -55,6 +55,7 @@ size_t ffmpeg_h5_filter(unsigned flags, size_t cd_nelmts, const unsigned int cd_
          * cd_values[8] = crf
          * cd_values[9] = film_grain [for svt-av1 only]
          * cd_values[10] = gpu_id [for nvidia gpu only]
+         * cd_values[11] = thread_count [optional, 0 = codec default]
          */
         const AVCodec *codec;
         AVCodecContext *c = NULL;
@@ -121,6 +122,11 @@ size_t ffmpeg_h5_filter(unsigned flags, size_t cd_nelmts, const unsigned int cd_
             goto CompressFailure;
         }
 
+        /* Optional encoder thread cap, so concurrent encodes don't each
+         * start one thread per core */
+        if (cd_nelmts > 11 && cd_values[11] > 0)
+            c->thread_count = cd_values[11];
+
         /* Add single threading just for testing purpose */
         // Actually, as of Jan. 2023, only x264, x265, svt-av1 support multithreading
         // So we will focus on these codecs for now.
@@ -1,33 +1,107 @@
+import sys
 import unittest
+import colorama
 from colorama import Fore, Back, Style
-from tabulate import tabulate
+
+
+class NoColor:
+    """Stand-in for colorama's Fore, Back and Style whose codes are all
+    empty strings."""
+
+    def __getattr__(self, name):
+        return ""
+
+
+_NO_COLOR = NoColor()
+_COLORAMA_INITED = False
+
+
+def is_tty(stream):
+    return getattr(stream, "isatty", lambda: False)()
+
+
+def terminal_colors(stream=None):
+    """
+    Return ``(Fore, Back, Style)`` for output written to ``stream``
+    (``sys.stdout`` by default).
+
+    On a terminal these are colorama's, and colorama is initialized on the
+    first call. Otherwise (CI logs, files) they are ``NoColor`` stand-ins, so
+    no escape codes end up in redirected output.
+    """
+    global _COLORAMA_INITED
+
+    if not is_tty(sys.stdout if stream is None else stream):
+        return _NO_COLOR, _NO_COLOR, _NO_COLOR
+
+    if not _COLORAMA_INITED:
+        colorama.init(autoreset=True)
+        _COLORAMA_INITED = True
+    return Fore, Back, Style
+
+
+# Result grading thresholds, best first
+PSNR_GRADES = (50, 40, 30)
+RATIO_GRADES = (10, 5, 2)
+SIZE_KB_GRADES = (100, 500, 1000)
+
+
+def grade(value, thresholds, lower_is_better=False):
+    """
+    Color code for ``value``: bright green past the first threshold, then
+    green, then yellow, and red past none of them. Values are past a
+    threshold when above it, or below it with ``lower_is_better``.
+    """
+    fore, _, style = terminal_colors()
+    colors = (fore.GREEN + style.BRIGHT, fore.GREEN, fore.YELLOW)
+    return next(
+        (
+            color
+            for limit, color in zip(thresholds, colors)
+            if (value < limit if lower_is_better else value > limit)
+        ),
+        fore.RED,
+    )
 
 
 class ColoredTestResult(unittest.TextTestResult):
     """Custom test result class that colorizes the output."""
 
+    def __init__(self, stream, descriptions, verbosity, **kwargs):
+        super().__init__(stream, descriptions, verbosity, **kwargs)
+        # Color prefixes/suffix are fixed, so build them once per run
+        fore, _, style = terminal_colors(stream)
+        self._OK_PREFIX = f"{fore.GREEN}✓ "
+        self._ERR_PREFIX = f"{fore.RED}✗ ERROR: "
+        self._FAIL_PREFIX = f"{fore.RED}✗ FAIL: "
+        self._SKIP_PREFIX = f"{fore.YELLOW}⚠ SKIP: "
+        self._SUFFIX = style.RESET_ALL
+
     def addSuccess(self, test):
         super().addSuccess(test)
         self.stream.writeln(
-            f"{Fore.GREEN}✓ {test.shortDescription() or str(test)}{Style.RESET_ALL}"
+            self._OK_PREFIX + (test.shortDescription() or str(test)) + self._SUFFIX
         )
 
     def addError(self, test, err):
         super().addError(test, err)
         self.stream.writeln(
-            f"{Fore.RED}✗ ERROR: {test.shortDescription() or str(test)}{Style.RESET_ALL}"
+            self._ERR_PREFIX + (test.shortDescription() or str(test)) + self._SUFFIX
         )
 
     def addFailure(self, test, err):
         super().addFailure(test, err)
         self.stream.writeln(
-            f"{Fore.RED}✗ FAIL: {test.shortDescription() or str(test)}{Style.RESET_ALL}"
+            self._FAIL_PREFIX + (test.shortDescription() or str(test)) + self._SUFFIX
         )
 
     def addSkip(self, test, reason):
         super().addSkip(test, reason)
         self.stream.writeln(
-            f"{Fore.YELLOW}⚠ SKIP: {test.shortDescription() or str(test)} ({reason}){Style.RESET_ALL}"
+            self._SKIP_PREFIX
+            + (test.shortDescription() or str(test))
+            + f" ({reason})"
+            + self._SUFFIX
         )
 
 
@@ -39,8 +113,19 @@ class ColoredTestRunner(unittest.TextTestRunner):
 
 def print_summary(name, result):
     """Print a colorized summary of test results."""
-    print(f"\n{Back.CYAN}{Fore.BLACK}{Style.BRIGHT} {name} SUMMARY {Style.RESET_ALL}")
-    print(f"{Fore.CYAN}{'═' * 60}{Style.RESET_ALL}")
+    fore, back, style = terminal_colors()
+    GREEN, RED, YELLOW, CYAN, RESET = (
+        fore.GREEN,
+        fore.RED,
+        fore.YELLOW,
+        fore.CYAN,
+        style.RESET_ALL,
+    )
+
+    lines = [
+        f"\n{back.CYAN}{fore.BLACK}{style.BRIGHT} {name} SUMMARY {RESET}",
+        f"{CYAN}{'═' * 60}{RESET}",
+    ]
 
     # Count results
     total = result.testsRun
@@ -54,23 +139,27 @@ def print_summary(name, result):
 
     # Determine overall status color
     if failed > 0 or errors > 0:
-        status_color = Fore.RED
+        status_color = RED
         status_text = "FAILED"
     else:
-        status_color = Fore.GREEN
+        status_color = GREEN
         status_text = "PASSED"
 
-    # Print counts with colors
-    print(f"Total tests: {total}")
-    print(f"  {Fore.GREEN}✓ Passed: {passed} ({pass_percent:.1f}%){Style.RESET_ALL}")
+    # Collect counts with colors
+    lines.append(f"Total tests: {total}")
+    lines.append(f"  {GREEN}✓ Passed: {passed} ({pass_percent:.1f}%){RESET}")
     if failed > 0:
-        print(f"  {Fore.RED}✗ Failed: {failed}{Style.RESET_ALL}")
+        lines.append(f"  {RED}✗ Failed: {failed}{RESET}")
     if errors > 0:
-        print(f"  {Fore.RED}✗ Errors: {errors}{Style.RESET_ALL}")
+        lines.append(f"  {RED}✗ Errors: {errors}{RESET}")
     if skipped > 0:
-        print(f"  {Fore.YELLOW}⚠ Skipped: {skipped}{Style.RESET_ALL}")
+        lines.append(f"  {YELLOW}⚠ Skipped: {skipped}{RESET}")
+
+    # Overall status
+    lines.append(f"{CYAN}{'─' * 60}{RESET}")
+    lines.append(f"Overall status: {status_color}{style.BRIGHT}{status_text}{RESET}")
+    lines.append(f"{CYAN}{'═' * 60}{RESET}")
 
-    # Print overall status
-    print(f"{Fore.CYAN}{'─' * 60}{Style.RESET_ALL}")
-    print(f"Overall status: {status_color}{Style.BRIGHT}{status_text}{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}{'═' * 60}{Style.RESET_ALL}")
+    # Emit the whole summary with a single write
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
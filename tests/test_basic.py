@@ -11,18 +11,55 @@ import h5ffmpeg as hf
 import h5py
 import os
 import sys
-import colorama
-from colorama import Fore, Back, Style
-from tabulate import tabulate
-from h5ffmpeg.utils import *
-
-# Initialize colorama
-colorama.init(autoreset=True)
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from h5ffmpeg.utils import (
+    calculate_psnr,
+    calculate_psnr_chunked,
+    compress_and_decompress,
+)
 
 # Import test utilities
 from test_utils import generate_3d_data
 
-from colored_test import ColoredTestRunner, print_summary
+from colored_test import (
+    PSNR_GRADES,
+    RATIO_GRADES,
+    ColoredTestRunner,
+    grade,
+    print_summary,
+    terminal_colors,
+)
+
+# colorama's codes on a terminal; empty strings when output is redirected
+Fore, Back, Style = terminal_colors()
+
+
+@lru_cache(maxsize=16)
+def _cached_data(width, height, depth, dtype, pattern, seed):
+    """Generate each test volume once and share it read-only between tests."""
+    data = generate_3d_data(
+        width=width,
+        height=height,
+        depth=depth,
+        dtype=dtype,
+        pattern=pattern,
+        seed=seed,
+    )
+    data.setflags(write=False)
+    return data
+
+
+@lru_cache(maxsize=4)
+def _output_buffer(shape, dtype):
+    """Decompression target reused by every test with the same shape/dtype."""
+    return np.empty(shape, dtype=dtype)
+
+
+# Registration can't change within a process, so query HDF5 only once
+_FFMPEG_REGISTERED = hasattr(hf, "FFMPEG_ID") and bool(
+    h5py.h5z.filter_avail(hf.FFMPEG_ID)
+)
 
 
 class TestBasicFunctionality(unittest.TestCase):
@@ -30,6 +67,18 @@ class TestBasicFunctionality(unittest.TestCase):
     Test basic functionality of the FFMPEG HDF5 filter.
     """
 
+    @classmethod
+    def setUpClass(cls):
+        """Warm up the codec libraries so the first timed test isn't charged
+        for loading and initializing them."""
+        dummy = np.zeros((2, 64, 64), dtype=np.uint8)
+        for make_options in (hf.x264, hf.x265, hf.svtav1):
+            try:
+                compress_and_decompress(dummy, make_options())
+            except Exception:
+                # Unavailable codecs are reported by their own tests
+                pass
+
     def setUp(self):
         """Set up test parameters."""
         # Define dimensions for the test data
@@ -58,56 +107,93 @@ class TestBasicFunctionality(unittest.TestCase):
 
     def print_result_table(self, results):
         """Print results in a colorized table format."""
-        headers = ["Parameter", "PSNR (dB)", "Compression Ratio"]
-        colored_data = []
-
+        # Pad the plain values before coloring so escape codes don't skew
+        # the column widths
+        lines = [
+            f"{'Parameter':<25}{'PSNR (dB)':>12}{'Compression Ratio':>20}",
+            "-" * 57,
+        ]
         for label, psnr, ratio in results:
-            # Color code PSNR values
-            if psnr > 50:
-                psnr_colored = f"{Fore.GREEN}{Style.BRIGHT}{psnr:.2f}{Style.RESET_ALL}"
-            elif psnr > 40:
-                psnr_colored = f"{Fore.GREEN}{psnr:.2f}{Style.RESET_ALL}"
-            elif psnr > 30:
-                psnr_colored = f"{Fore.YELLOW}{psnr:.2f}{Style.RESET_ALL}"
-            else:
-                psnr_colored = f"{Fore.RED}{psnr:.2f}{Style.RESET_ALL}"
-
-            # Color code compression ratio values
-            if ratio > 10:
-                ratio_colored = (
-                    f"{Fore.GREEN}{Style.BRIGHT}{ratio:.2f}x{Style.RESET_ALL}"
-                )
-            elif ratio > 5:
-                ratio_colored = f"{Fore.GREEN}{ratio:.2f}x{Style.RESET_ALL}"
-            elif ratio > 2:
-                ratio_colored = f"{Fore.YELLOW}{ratio:.2f}x{Style.RESET_ALL}"
-            else:
-                ratio_colored = f"{Fore.RED}{ratio:.2f}x{Style.RESET_ALL}"
+            lines.append(
+                f"{label:<25}"
+                f"{grade(psnr, PSNR_GRADES)}{psnr:>12.2f}{Style.RESET_ALL}"
+                f"{grade(ratio, RATIO_GRADES)}{ratio:>19.2f}x{Style.RESET_ALL}"
+            )
+
+        # Write the table in one go
+        sys.stdout.write("\n".join(lines) + "\n")
 
-            colored_data.append([label, psnr_colored, ratio_colored])
+    def assert_and_psnr(self, original, decompressed):
+        """Check that shape and dtype survived the round trip; return PSNR."""
+        self.assertEqual(original.shape, decompressed.shape)
+        self.assertEqual(original.dtype, decompressed.dtype)
 
-        # Print the table
-        print(tabulate(colored_data, headers=headers, tablefmt="simple"))
+        # Same buffer (e.g. a pass-through filter): nothing to compare
+        if original.ctypes.data == decompressed.ctypes.data:
+            return float("inf")
+        return calculate_psnr(original, decompressed)
 
     def test_filter_registration(self):
         """Test if the FFMPEG filter is properly registered."""
-        # Check if FFMPEG filter ID is defined
-        self.assertTrue(hasattr(hf, "FFMPEG_ID"))
-
-        # Check if h5py can see our filter
-        self.assertTrue(h5py.h5z.filter_avail(hf.FFMPEG_ID))
+        # FFMPEG filter ID is defined and h5py can see our filter
+        self.assertTrue(_FFMPEG_REGISTERED)
 
         print(
             f"{Fore.GREEN}✓ FFMPEG filter is properly registered with ID: {hf.FFMPEG_ID}{Style.RESET_ALL}"
         )
 
+    def test_float64_dataset_with_quant_attrs(self):
+        """Test reading a float64 dataset that carries quantization attrs."""
+        data = np.arange(24, dtype=np.float64).reshape(2, 3, 4)
+
+        with h5py.File("quant.h5", "w", driver="core", backing_store=False) as f:
+            dset = f.create_dataset("data", data=data)
+            dset.attrs["bit"] = 8
+            dset.attrs["norm"] = True
+
+            # norm over the full 8-bit range maps each stored value onto itself
+            result = dset[()]
+
+        self.assertEqual(result.dtype, np.uint8)
+        np.testing.assert_array_equal(result, data.astype(np.uint8))
+
+    def test_too_many_indices_with_quant_attrs(self):
+        """Test that over-indexing a quantized dataset still raises."""
+        data = np.zeros((2, 3, 4), dtype=np.uint8)
+
+        with h5py.File("quant.h5", "w", driver="core", backing_store=False) as f:
+            dset = f.create_dataset("data", data=data)
+            dset.attrs["bit"] = 8
+            dset.attrs["norm"] = True
+
+            with self.assertRaises(ValueError):
+                dset[:, :, :, :]
+            with self.assertRaises(ValueError):
+                dset[:, :, :, :] = data.astype(np.float64)
+
+    def test_chunked_psnr(self):
+        """Test that chunk-by-chunk PSNR matches PSNR of the whole array."""
+        original = _cached_data(
+            width=70, height=50, depth=9, dtype=np.uint8, pattern="random", seed=0
+        )
+        noisy = original ^ np.uint8(3)
+
+        # Chunks that don't divide the shape, so edge chunks are partial
+        with h5py.File("psnr.h5", "w", driver="core", backing_store=False) as f:
+            dset = f.create_dataset(
+                "data", data=noisy, chunks=(4, 32, 32), compression="gzip"
+            )
+            chunked = calculate_psnr_chunked(original, dset)
+
+        self.assertAlmostEqual(chunked, calculate_psnr(original, noisy))
+
     def test_basic_compression_8bit(self):
         """Test basic compression/decompression with 8-bit data."""
         # Generate 3D test data (8-bit)
         print(
             f"{Fore.BLUE}ℹ Generating 8-bit test data ({self.depth}x{self.height}x{self.width})...{Style.RESET_ALL}"
         )
-        test_data = generate_3d_data(
+        test_data = _cached_data(
             width=self.width,
             height=self.height,
             depth=self.depth,
@@ -124,17 +210,15 @@ class TestBasicFunctionality(unittest.TestCase):
 
         # Compress and decompress
         decompressed_data, compression_ratio, compressed_size, enc_time, dec_time = (
-            compress_and_decompress(test_data, compression_options)
+            compress_and_decompress(
+                test_data,
+                compression_options,
+                out=_output_buffer(test_data.shape, test_data.dtype),
+            )
         )
 
-        # Check that shapes match
-        self.assertEqual(test_data.shape, decompressed_data.shape)
-
-        # Check that dtype matches
-        self.assertEqual(test_data.dtype, decompressed_data.dtype)
-
-        # Calculate PSNR
-        psnr = calculate_psnr(test_data, decompressed_data)
+        # Check shape/dtype and calculate PSNR
+        psnr = self.assert_and_psnr(test_data, decompressed_data)
 
         # Print results in color
         results = [("8-bit (H.264)", psnr, compression_ratio)]
@@ -155,7 +239,7 @@ class TestBasicFunctionality(unittest.TestCase):
         print(
             f"{Fore.BLUE}ℹ Generating 16-bit test data ({self.depth}x{self.height}x{self.width})...{Style.RESET_ALL}"
         )
-        test_data = generate_3d_data(
+        test_data = _cached_data(
             width=self.width,
             height=self.height,
             depth=self.depth,
@@ -172,17 +256,15 @@ class TestBasicFunctionality(unittest.TestCase):
 
         # Compress and decompress
         decompressed_data, compression_ratio, compressed_size, enc_time, dec_time = (
-            compress_and_decompress(test_data, compression_options)
+            compress_and_decompress(
+                test_data,
+                compression_options,
+                out=_output_buffer(test_data.shape, test_data.dtype),
+            )
         )
 
-        # Check that shapes match
-        self.assertEqual(test_data.shape, decompressed_data.shape)
-
-        # Check that dtype matches
-        self.assertEqual(test_data.dtype, decompressed_data.dtype)
-
-        # Calculate PSNR
-        psnr = calculate_psnr(test_data, decompressed_data)
+        # Check shape/dtype and calculate PSNR
+        psnr = self.assert_and_psnr(test_data, decompressed_data)
 
         # Print results in color
         results = [("16-bit (H.264 10-bit)", psnr, compression_ratio)]
@@ -203,7 +285,7 @@ class TestBasicFunctionality(unittest.TestCase):
         print(
             f"{Fore.BLUE}ℹ Generating gradient test data ({self.depth}x{self.height}x{self.width})...{Style.RESET_ALL}"
         )
-        test_data = generate_3d_data(
+        test_data = _cached_data(
             width=self.width,
             height=self.height,
             depth=self.depth,
@@ -218,14 +300,18 @@ class TestBasicFunctionality(unittest.TestCase):
 
         # Compress and decompress
         decompressed_data, compression_ratio, compressed_size, enc_time, dec_time = (
-            compress_and_decompress(test_data, compression_options)
+            compress_and_decompress(
+                test_data,
+                compression_options,
+                out=_output_buffer(test_data.shape, test_data.dtype),
+            )
         )
 
-        # Calculate PSNR
-        psnr = calculate_psnr(test_data, decompressed_data)
+        # Only the compression ratio is asserted here, so skip the PSNR pass
+        del decompressed_data
 
         # Print results in color
-        results = [("Gradient Data", psnr, compression_ratio)]
+        results = [("Gradient Data", float("nan"), compression_ratio)]
         self.print_result_table(results)
         print(
             f"{Fore.BLUE}ℹ Processing time: {enc_time + dec_time:.2f} seconds{Style.RESET_ALL}"
@@ -240,7 +326,7 @@ class TestBasicFunctionality(unittest.TestCase):
         print(
             f"{Fore.BLUE}ℹ Generating striped test data ({self.depth}x{self.height}x{self.width})...{Style.RESET_ALL}"
         )
-        test_data = generate_3d_data(
+        test_data = _cached_data(
             width=self.width,
             height=self.height,
             depth=self.depth,
@@ -255,14 +341,18 @@ class TestBasicFunctionality(unittest.TestCase):
 
         # Compress and decompress
         decompressed_data, compression_ratio, compressed_size, enc_time, dec_time = (
-            compress_and_decompress(test_data, compression_options)
+            compress_and_decompress(
+                test_data,
+                compression_options,
+                out=_output_buffer(test_data.shape, test_data.dtype),
+            )
         )
 
-        # Calculate PSNR
-        psnr = calculate_psnr(test_data, decompressed_data)
+        # Only the compression ratio is asserted here, so skip the PSNR pass
+        del decompressed_data
 
         # Print results in color
-        results = [("Striped Data", psnr, compression_ratio)]
+        results = [("Striped Data", float("nan"), compression_ratio)]
         self.print_result_table(results)
         print(
             f"{Fore.BLUE}ℹ Processing time: {enc_time + dec_time:.2f} seconds{Style.RESET_ALL}"
@@ -277,7 +367,7 @@ class TestBasicFunctionality(unittest.TestCase):
         print(
             f"{Fore.BLUE}ℹ Generating random test data ({self.depth}x{self.height}x{self.width})...{Style.RESET_ALL}"
         )
-        test_data = generate_3d_data(
+        test_data = _cached_data(
             width=self.width,
             height=self.height,
             depth=self.depth,
@@ -288,26 +378,39 @@ class TestBasicFunctionality(unittest.TestCase):
 
         results = []
 
-        # Test different CRF values (lower = higher quality)
-        for crf in [18, 23, 28]:
+        # Test different CRF values (lower = higher quality). The encodes are
+        # independent; run them in separate processes since h5py serializes
+        # all HDF5 calls within one process
+        crfs = [18, 23, 28]
+        # Split the cores between the concurrent encodes
+        threads = max(1, (os.cpu_count() or 1) // len(crfs))
+        for crf in crfs:
             print(f"{Fore.BLUE}ℹ Testing H.264 with CRF={crf}...{Style.RESET_ALL}")
-            compression_options = hf.x264(crf=crf)
-
-            # Compress and decompress
-            (
-                decompressed_data,
-                compression_ratio,
-                compressed_size,
-                enc_time,
-                dec_time,
-            ) = compress_and_decompress(test_data, compression_options)
-
-            # Calculate PSNR
-            psnr = calculate_psnr(test_data, decompressed_data)
-            results.append((f"CRF {crf}", psnr, compression_ratio))
-            print(
-                f"{Fore.BLUE}ℹ Processing time: {enc_time + dec_time:.2f} seconds{Style.RESET_ALL}"
-            )
+        with ProcessPoolExecutor(max_workers=len(crfs)) as executor:
+            futures = [
+                executor.submit(
+                    compress_and_decompress,
+                    test_data,
+                    hf.x264(crf=crf, threads=threads),
+                )
+                for crf in crfs
+            ]
+
+            for crf, future in zip(crfs, futures):
+                (
+                    decompressed_data,
+                    compression_ratio,
+                    compressed_size,
+                    enc_time,
+                    dec_time,
+                ) = future.result()
+
+                # Check shape/dtype and calculate PSNR
+                psnr = self.assert_and_psnr(test_data, decompressed_data)
+                results.append((f"CRF {crf}", psnr, compression_ratio))
+                print(
+                    f"{Fore.BLUE}ℹ CRF={crf} processing time: {enc_time + dec_time:.2f} seconds{Style.RESET_ALL}"
+                )
 
         # Print results table
         self.print_result_table(results)
@@ -326,7 +429,7 @@ class TestBasicFunctionality(unittest.TestCase):
             print(
                 f"{Fore.BLUE}ℹ Generating random test data ({self.depth}x{self.height}x{self.width})...{Style.RESET_ALL}"
             )
-            test_data = generate_3d_data(
+            test_data = _cached_data(
                 width=self.width,
                 height=self.height,
                 depth=self.depth,
@@ -348,10 +451,14 @@ class TestBasicFunctionality(unittest.TestCase):
                 compressed_size,
                 enc_time,
                 dec_time,
-            ) = compress_and_decompress(test_data, compression_options)
+            ) = compress_and_decompress(
+                test_data,
+                compression_options,
+                out=_output_buffer(test_data.shape, test_data.dtype),
+            )
 
-            # Calculate PSNR
-            psnr = calculate_psnr(test_data, decompressed_data)
+            # Check shape/dtype and calculate PSNR
+            psnr = self.assert_and_psnr(test_data, decompressed_data)
 
             # Print results in color
             results = [("H.265/HEVC", psnr, compression_ratio)]
@@ -376,7 +483,7 @@ class TestBasicFunctionality(unittest.TestCase):
             print(
                 f"{Fore.BLUE}ℹ Generating random test data ({self.depth}x{self.height}x{self.width})...{Style.RESET_ALL}"
             )
-            test_data = generate_3d_data(
+            test_data = _cached_data(
                 width=self.width,
                 height=self.height,
                 depth=self.depth,
@@ -398,10 +505,14 @@ class TestBasicFunctionality(unittest.TestCase):
                 compressed_size,
                 enc_time,
                 dec_time,
-            ) = compress_and_decompress(test_data, compression_options)
+            ) = compress_and_decompress(
+                test_data,
+                compression_options,
+                out=_output_buffer(test_data.shape, test_data.dtype),
+            )
 
-            # Calculate PSNR
-            psnr = calculate_psnr(test_data, decompressed_data)
+            # Check shape/dtype and calculate PSNR
+            psnr = self.assert_and_psnr(test_data, decompressed_data)
 
             # Print results in color
             results = [("SVT-AV1", psnr, compression_ratio)]
@@ -5,6 +5,7 @@ This module contains test cases for integration with h5py and other libraries,
 focusing on 3D datasets with 8-bit and 16-bit integer types.
 """
 
+import io
 import unittest
 import numpy as np
 import h5py
@@ -12,21 +13,67 @@ import os
 import sys
 import tempfile
 import shutil
-import colorama
-from colorama import Fore, Back, Style
-from tabulate import tabulate
-
-# Initialize colorama
-colorama.init(autoreset=True)
 
 # Import the FFMPEG HDF5 filter package
 import h5ffmpeg as hf
-from h5ffmpeg.utils import *
+from h5ffmpeg.utils import calculate_psnr, calculate_psnr_chunked
 
 # Import test utilities
 from test_utils import generate_3d_data
 
-from colored_test import ColoredTestRunner, print_summary
+from colored_test import (
+    PSNR_GRADES,
+    RATIO_GRADES,
+    SIZE_KB_GRADES,
+    ColoredTestRunner,
+    grade,
+    print_summary,
+    terminal_colors,
+)
+
+# colorama's codes on a terminal; empty strings when output is redirected
+# (CI logs), which also skips colorama's stdout wrapper
+Fore, Back, Style = terminal_colors()
+
+_RESET = Style.RESET_ALL
+
+_TABLE_FMT = "{:<28} {:>10} {:>18} {:>14}"
+_TABLE_HEADER = (
+    _TABLE_FMT.format("Dataset", "PSNR (dB)", "Compression Ratio", "File Size (KB)")
+    + "\n"
+    + "-" * 73
+)
+
+
+# Test files are written once and reopened right away, so keep their
+# metadata together in pages and serve reopened files from a page buffer
+_PAGE_SIZE = 4096
+_PAGE_BUF_SIZE = 4 * 1024 * 1024
+
+
+def _open_w(path, **kwargs):
+    """Create an HDF5 file with paged file space management."""
+    return h5py.File(
+        path,
+        "w",
+        fs_strategy="page",
+        fs_persist=True,
+        fs_threshold=1,
+        fs_page_size=_PAGE_SIZE,
+        **kwargs,
+    )
+
+
+def _open_r(path, **kwargs):
+    """Open a file made by ``_open_w`` for reading through a page buffer."""
+    return h5py.File(
+        path,
+        "r",
+        page_buf_size=_PAGE_BUF_SIZE,
+        min_meta_keep=50,
+        min_raw_keep=50,
+        **kwargs,
+    )
 
 
 class TestIntegration(unittest.TestCase):
@@ -34,144 +81,154 @@ class TestIntegration(unittest.TestCase):
     Test integration of the FFMPEG HDF5 filter with h5py and other libraries.
     """
 
-    def setUp(self):
-        """Set up test parameters."""
+    # These tests check h5py plumbing, not codec quality, so they encode with
+    # x264's cheapest settings; test_h5py_integration keeps the default preset
+    FAST_OPTS = hf.x264(crf=23, preset="ultrafast", tune="zerolatency")
+
+    @classmethod
+    def setUpClass(cls):
+        """Generate the (deterministic) test data once for all tests."""
         # Define dimensions for the test data
-        self.width = 256
-        self.height = 256
-        self.depth = 50
+        cls.width = 256
+        cls.height = 256
+        cls.depth = 50
 
         # Set random seed for reproducibility
-        self.seed = 42
+        cls.seed = 42
 
-        # Generate test data once for all tests
+        # Generate test data once for all tests; read-only so no test can
+        # change what the next one sees
         print(
-            f"{Fore.BLUE}ℹ Generating 8-bit test data ({self.depth}x{self.height}x{self.width})...{Style.RESET_ALL}"
+            f"{Fore.BLUE}ℹ Generating 8-bit test data ({cls.depth}x{cls.height}x{cls.width})...{Style.RESET_ALL}"
         )
-        self.test_data_8bit = generate_3d_data(
-            width=self.width,
-            height=self.height,
-            depth=self.depth,
+        cls.test_data_8bit = generate_3d_data(
+            width=cls.width,
+            height=cls.height,
+            depth=cls.depth,
             dtype=np.uint8,
             pattern="stripes",
-            seed=self.seed,
+            seed=cls.seed,
         )
+        cls.test_data_8bit.setflags(write=False)
 
         print(
-            f"{Fore.BLUE}ℹ Generating 16-bit test data ({self.depth}x{self.height}x{self.width})...{Style.RESET_ALL}"
+            f"{Fore.BLUE}ℹ Generating 16-bit test data ({cls.depth}x{cls.height}x{cls.width})...{Style.RESET_ALL}"
         )
-        self.test_data_16bit = generate_3d_data(
-            width=self.width,
-            height=self.height,
-            depth=self.depth,
+        cls.test_data_16bit = generate_3d_data(
+            width=cls.width,
+            height=cls.height,
+            depth=cls.depth,
             dtype=np.uint16,
             pattern="stripes",
-            seed=self.seed,
+            seed=cls.seed,
         )
+        cls.test_data_16bit.setflags(write=False)
 
-        # Create a temporary directory for test files
-        self.temp_dir = tempfile.mkdtemp()
+        # 8-bit datasets are stored unquantized, so full reads can go
+        # straight into one reusable buffer via read_direct
+        cls._buf8 = np.empty_like(cls.test_data_8bit)
+
+        # One temporary directory for the whole class; every test writes its
+        # own uniquely named file inside it
+        cls.temp_dir = tempfile.mkdtemp()
         print(
-            f"{Fore.BLUE}ℹ Created temporary directory for test files: {self.temp_dir}{Style.RESET_ALL}"
+            f"{Fore.BLUE}ℹ Created temporary directory for test files: {cls.temp_dir}{Style.RESET_ALL}"
         )
 
-        # Print test header
-        test_name = self._testMethodName
-        print(f"\n{Fore.CYAN}{Style.BRIGHT}▶ Running: {test_name}{Style.RESET_ALL}")
-        print(f"{Fore.CYAN}{'─' * 60}{Style.RESET_ALL}")
+        # The 8-bit volume with default H.264 settings is needed by more than
+        # one test; encode it once here and let the tests copy it
+        cls._template = os.path.join(cls.temp_dir, "_template.h5")
+        print(
+            f"{Fore.BLUE}ℹ Encoding 8-bit template with H.264 (CRF=23)...{Style.RESET_ALL}"
+        )
+        with _open_w(cls._template) as f:
+            f.create_dataset("data", data=cls.test_data_8bit, **hf.x264(crf=23))
 
-    def tearDown(self):
-        """Clean up after tests."""
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up after all tests."""
         # Remove temporary directory and its contents
-        shutil.rmtree(self.temp_dir)
+        shutil.rmtree(cls.temp_dir)
         print(
             f"{Fore.BLUE}ℹ Removed temporary directory and test files{Style.RESET_ALL}"
         )
-        print(f"{Fore.CYAN}{'─' * 60}{Style.RESET_ALL}\n")
+
+    def setUp(self):
+        """Set up per-test scaffolding."""
+        # Buffer the test's output and write it out in one go in tearDown
+        self._out = io.StringIO()
+
+        # Print test header
+        test_name = self._testMethodName
+        self._log(f"\n{Fore.CYAN}{Style.BRIGHT}▶ Running: {test_name}{Style.RESET_ALL}")
+        self._log(f"{Fore.CYAN}{'─' * 60}{Style.RESET_ALL}")
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self._log(f"{Fore.CYAN}{'─' * 60}{Style.RESET_ALL}\n")
+        sys.stdout.write(self._out.getvalue())
+        sys.stdout.flush()
+
+    def _log(self, msg):
+        """Append a line to this test's output buffer."""
+        self._out.write(msg)
+        self._out.write("\n")
+
+    def read_8bit(self, dset):
+        """Read a whole 8-bit dataset into the shared class buffer."""
+        dset.read_direct(self._buf8)
+        return self._buf8
 
     def print_result_table(self, results):
         """Print results in a colorized table format."""
-        headers = ["Dataset", "PSNR (dB)", "Compression Ratio", "File Size (KB)"]
-        colored_data = []
+        lines = [_TABLE_HEADER]
 
         for label, psnr, ratio, size_kb in results:
-            # Color code PSNR values
-            if psnr > 50:
-                psnr_colored = f"{Fore.GREEN}{Style.BRIGHT}{psnr:.2f}{Style.RESET_ALL}"
-            elif psnr > 40:
-                psnr_colored = f"{Fore.GREEN}{psnr:.2f}{Style.RESET_ALL}"
-            elif psnr > 30:
-                psnr_colored = f"{Fore.YELLOW}{psnr:.2f}{Style.RESET_ALL}"
-            else:
-                psnr_colored = f"{Fore.RED}{psnr:.2f}{Style.RESET_ALL}"
-
-            # Color code compression ratio values
-            if ratio > 10:
-                ratio_colored = (
-                    f"{Fore.GREEN}{Style.BRIGHT}{ratio:.2f}x{Style.RESET_ALL}"
-                )
-            elif ratio > 5:
-                ratio_colored = f"{Fore.GREEN}{ratio:.2f}x{Style.RESET_ALL}"
-            elif ratio > 2:
-                ratio_colored = f"{Fore.YELLOW}{ratio:.2f}x{Style.RESET_ALL}"
-            else:
-                ratio_colored = f"{Fore.RED}{ratio:.2f}x{Style.RESET_ALL}"
-
-            # Color code file size
-            if size_kb < 100:
-                size_colored = (
-                    f"{Fore.GREEN}{Style.BRIGHT}{size_kb:.1f}{Style.RESET_ALL}"
-                )
-            elif size_kb < 500:
-                size_colored = f"{Fore.GREEN}{size_kb:.1f}{Style.RESET_ALL}"
-            elif size_kb < 1000:
-                size_colored = f"{Fore.YELLOW}{size_kb:.1f}{Style.RESET_ALL}"
-            else:
-                size_colored = f"{Fore.RED}{size_kb:.1f}{Style.RESET_ALL}"
-
-            colored_data.append([label, psnr_colored, ratio_colored, size_colored])
+            # Higher PSNR/ratio and smaller sizes get the brighter colors
+            psnr_color = grade(psnr, PSNR_GRADES)
+            ratio_color = grade(ratio, RATIO_GRADES)
+            size_color = grade(size_kb, SIZE_KB_GRADES, lower_is_better=True)
+
+            # Pad the plain values before coloring so escape codes don't skew
+            # the column widths
+            lines.append(
+                f"{label:<28} "
+                f"{psnr_color}{psnr:>10.2f}{_RESET} "
+                f"{ratio_color}{ratio:>17.2f}x{_RESET} "
+                f"{size_color}{size_kb:>14.1f}{_RESET}"
+            )
 
         # Print the table
-        print(tabulate(colored_data, headers=headers, tablefmt="simple"))
+        self._log("\n".join(lines))
 
     def test_h5py_integration(self):
         """Test basic integration with h5py."""
         # Create a temporary HDF5 file
         h5_file = os.path.join(self.temp_dir, "test_h5py.h5")
-        print(f"{Fore.BLUE}ℹ Testing basic integration with h5py...{Style.RESET_ALL}")
-
-        # Compression options
-        compression_options = hf.x264(crf=23)
-        print(f"{Fore.BLUE}ℹ Using H.264 compression with CRF=23{Style.RESET_ALL}")
+        self._log(
+            f"{Fore.BLUE}ℹ Testing basic integration with h5py...{Style.RESET_ALL}"
+        )
 
-        # Write data with compression
-        print(f"{Fore.BLUE}ℹ Writing compressed data to HDF5 file...{Style.RESET_ALL}")
-        with h5py.File(h5_file, "w") as f:
-            f.create_dataset("data", data=self.test_data_8bit, **compression_options)
+        # The class template holds exactly this write: H.264 at CRF=23
+        self._log(f"{Fore.BLUE}ℹ Using H.264 compression with CRF=23{Style.RESET_ALL}")
+        shutil.copyfile(self._template, h5_file)
 
         file_size_kb = os.path.getsize(h5_file) / 1024
-        print(f"{Fore.BLUE}ℹ File size: {file_size_kb:.1f} KB{Style.RESET_ALL}")
+        self._log(f"{Fore.BLUE}ℹ File size: {file_size_kb:.1f} KB{Style.RESET_ALL}")
 
-        # Read back the data
-        print(f"{Fore.BLUE}ℹ Reading back compressed data...{Style.RESET_ALL}")
-        with h5py.File(h5_file, "r") as f:
-            # Read data
-            decompressed_data = f["data"][:]
-
-            # Check shape and dtype
-            self.assertEqual(decompressed_data.shape, self.test_data_8bit.shape)
-            self.assertEqual(decompressed_data.dtype, self.test_data_8bit.dtype)
-            print(f"{Fore.GREEN}✓ Shape and dtype match original data{Style.RESET_ALL}")
+        with _open_r(h5_file) as f:
+            # Read back the data
+            self._log(f"{Fore.BLUE}ℹ Reading back compressed data...{Style.RESET_ALL}")
+            decompressed_data = self.read_8bit(f["data"])
 
             # Check quality
             psnr = calculate_psnr(self.test_data_8bit, decompressed_data)
-            print(f"{Fore.BLUE}ℹ PSNR: {psnr:.2f} dB{Style.RESET_ALL}")
+            self._log(f"{Fore.BLUE}ℹ PSNR: {psnr:.2f} dB{Style.RESET_ALL}")
             self.assertGreater(psnr, 40.0)
 
             # Calculate compression ratio
             original_size = self.test_data_8bit.nbytes
-            compressed_size = os.path.getsize(h5_file)
-            compression_ratio = original_size / compressed_size
+            compression_ratio = original_size / (file_size_kb * 1024)
 
             # Print results table
             results = [("H.264 (CRF=23)", psnr, compression_ratio, file_size_kb)]
@@ -181,7 +238,7 @@ class TestIntegration(unittest.TestCase):
         """Test with chunked datasets."""
         # Create a temporary HDF5 file
         h5_file = os.path.join(self.temp_dir, "test_chunked.h5")
-        print(
+        self._log(
             f"{Fore.BLUE}ℹ Testing compression with different chunk sizes...{Style.RESET_ALL}"
         )
 
@@ -192,44 +249,43 @@ class TestIntegration(unittest.TestCase):
             (5, 128, 128),  # Medium chunks
         ]
 
-        results = []
-
-        for i, chunks in enumerate(chunk_sizes):
-            dataset_name = f"data_{i}"
-            chunk_label = f"Chunks {chunks}"
-
-            print(f"{Fore.BLUE}ℹ Testing with chunk size {chunks}...{Style.RESET_ALL}")
-
-            # Compression options
-            compression_options = hf.x264(crf=23)
+        # Compression options
+        compression_options = self.FAST_OPTS
 
-            # Write data with compression and specified chunks
-            with h5py.File(h5_file, "w") as f:
+        # Write every configuration into one file, one dataset each
+        with _open_w(h5_file) as f:
+            for i, chunks in enumerate(chunk_sizes):
+                self._log(
+                    f"{Fore.BLUE}ℹ Writing with chunk size {chunks}...{Style.RESET_ALL}"
+                )
                 f.create_dataset(
-                    dataset_name,
+                    f"data_{i}",
                     data=self.test_data_8bit,
                     chunks=chunks,
                     **compression_options,
                 )
 
-            file_size_kb = os.path.getsize(h5_file) / 1024
+        results = []
+
+        # Read back the data
+        with _open_r(h5_file) as f:
+            for i, chunks in enumerate(chunk_sizes):
+                chunk_label = f"Chunks {chunks}"
 
-            # Read back the data
-            with h5py.File(h5_file, "r") as f:
                 # Check that chunks are as specified
-                dataset = f[dataset_name]
+                dataset = f[f"data_{i}"]
                 self.assertEqual(dataset.chunks, chunks)
 
-                # Read data
-                decompressed_data = dataset[:]
+                # The file holds all three, so size each dataset by the
+                # bytes its chunks occupy
+                file_size_kb = dataset.id.get_storage_size() / 1024
 
-                # Check quality
-                psnr = calculate_psnr(self.test_data_8bit, decompressed_data)
+                # Check quality chunk by chunk, without reading it all
+                psnr = calculate_psnr_chunked(self.test_data_8bit, dataset)
 
                 # Calculate compression ratio
                 original_size = self.test_data_8bit.nbytes
-                compressed_size = os.path.getsize(h5_file)
-                compression_ratio = original_size / compressed_size
+                compression_ratio = original_size / (file_size_kb * 1024)
 
                 results.append((chunk_label, psnr, compression_ratio, file_size_kb))
 
@@ -240,7 +296,7 @@ class TestIntegration(unittest.TestCase):
         for label, psnr, ratio, _ in results:
             self.assertGreater(psnr, 40.0, f"PSNR for {label} is too low")
 
-        print(
+        self._log(
             f"{Fore.GREEN}✓ All chunk sizes provide acceptable quality (PSNR > 40 dB){Style.RESET_ALL}"
         )
 
@@ -248,47 +304,65 @@ class TestIntegration(unittest.TestCase):
         """Test partial dataset reads."""
         # Create a temporary HDF5 file
         h5_file = os.path.join(self.temp_dir, "test_partial.h5")
-        print(f"{Fore.BLUE}ℹ Testing partial dataset reads...{Style.RESET_ALL}")
+        self._log(f"{Fore.BLUE}ℹ Testing partial dataset reads...{Style.RESET_ALL}")
 
         # Write data with compression
-        print(
+        self._log(
             f"{Fore.BLUE}ℹ Writing compressed dataset with chunks...{Style.RESET_ALL}"
         )
-        with h5py.File(h5_file, "w") as f:
+        with _open_w(h5_file) as f:
             f.create_dataset(
-                "data", data=self.test_data_8bit, chunks=(10, 64, 64), **hf.x264(crf=23)
+                "data", data=self.test_data_8bit, chunks=(10, 64, 64), **self.FAST_OPTS
             )
 
         # Read parts of the data
-        print(
+        self._log(
             f"{Fore.BLUE}ℹ Reading partial sections of the dataset...{Style.RESET_ALL}"
         )
-        with h5py.File(h5_file, "r") as f:
+        # Size the chunk cache so every chunk touched below is decoded at
+        # most once across the overlapping reads
+        with _open_r(
+            h5_file, rdcc_nbytes=32 * 1024 * 1024, rdcc_nslots=521, rdcc_w0=0.75
+        ) as f:
             dataset = f["data"]
 
             # Read first 10 slices
-            print(f"{Fore.BLUE}ℹ Reading first 10 slices...{Style.RESET_ALL}")
-            partial_data = dataset[0:10, :, :]
+            self._log(f"{Fore.BLUE}ℹ Reading first 10 slices...{Style.RESET_ALL}")
+            sel = np.s_[0:10, :, :]
+            partial_data = dataset[sel]
             self.assertEqual(partial_data.shape, (10, self.height, self.width))
-            print(
+            self.assertGreater(
+                calculate_psnr(self.test_data_8bit[sel], partial_data), 40
+            )
+            self._log(
                 f"{Fore.GREEN}✓ First 10 slices read successfully with shape {partial_data.shape}{Style.RESET_ALL}"
             )
 
             # Read middle region
-            print(
+            self._log(
                 f"{Fore.BLUE}ℹ Reading middle region (20:30, 50:150, 50:150)...{Style.RESET_ALL}"
             )
-            partial_data = dataset[20:30, 50:150, 50:150]
-            self.assertEqual(partial_data.shape, (10, 100, 100))
-            print(
+            sel = np.s_[20:30, 50:150, 50:150]
+            partial_data = np.empty((10, 100, 100), dtype=dataset.dtype)
+            dataset.read_direct(partial_data, source_sel=sel)
+            self.assertGreater(
+                calculate_psnr(self.test_data_8bit[sel], partial_data), 40
+            )
+            self._log(
                 f"{Fore.GREEN}✓ Middle region read successfully with shape {partial_data.shape}{Style.RESET_ALL}"
             )
 
             # Read single slice
-            print(f"{Fore.BLUE}ℹ Reading single slice (index 25)...{Style.RESET_ALL}")
-            partial_data = dataset[25, :, :]
+            self._log(
+                f"{Fore.BLUE}ℹ Reading single slice (index 25)...{Style.RESET_ALL}"
+            )
+            sel = np.s_[25, :, :]
+            partial_data = dataset[sel]
             self.assertEqual(partial_data.shape, (self.height, self.width))
-            print(
+            self.assertGreater(
+                calculate_psnr(self.test_data_8bit[sel], partial_data), 40
+            )
+            self._log(
                 f"{Fore.GREEN}✓ Single slice read successfully with shape {partial_data.shape}{Style.RESET_ALL}"
             )
 
@@ -296,49 +370,58 @@ class TestIntegration(unittest.TestCase):
         """Test with different data types."""
         # Create a temporary HDF5 file
         h5_file = os.path.join(self.temp_dir, "test_datatypes.h5")
-        print(
+        self._log(
             f"{Fore.BLUE}ℹ Testing compression with different data types...{Style.RESET_ALL}"
         )
 
-        # Test with 8-bit and 16-bit data
+        # Test with 8-bit and 16-bit data; the 8-bit one is copied from the
+        # class template, which was encoded with these same default options
         datasets = [
-            ("data_8bit", self.test_data_8bit, hf.x264()),
+            ("data_8bit", self.test_data_8bit, None),
             ("data_16bit", self.test_data_16bit, hf.x264(bit_mode=hf.BitMode.BIT_10)),
         ]
 
         # Write datasets
-        print(f"{Fore.BLUE}ℹ Writing 8-bit and 16-bit datasets...{Style.RESET_ALL}")
-        with h5py.File(h5_file, "w") as f:
+        self._log(f"{Fore.BLUE}ℹ Writing 8-bit and 16-bit datasets...{Style.RESET_ALL}")
+        # No chunk cache, so reading back through the same handle still
+        # decodes from the file
+        with _open_w(h5_file, rdcc_nbytes=0) as f:
             for name, data, options in datasets:
-                print(f"{Fore.BLUE}ℹ Writing {name} dataset...{Style.RESET_ALL}")
-                f.create_dataset(name, data=data, **options)
-
-        # Read datasets
-        results = []
-        print(
-            f"{Fore.BLUE}ℹ Reading back datasets and calculating metrics...{Style.RESET_ALL}"
-        )
-        with h5py.File(h5_file, "r") as f:
+                self._log(f"{Fore.BLUE}ℹ Writing {name} dataset...{Style.RESET_ALL}")
+                if options is None:
+                    with h5py.File(self._template, "r") as template:
+                        f.copy(template["data"], f, name=name)
+                else:
+                    f.create_dataset(name, data=data, **options)
+            f.flush()
+
+            # Approximate per-dataset size, since the file holds all of them;
+            # the file doesn't change while reading, so stat it once
+            file_size_kb = os.path.getsize(h5_file) / 1024 / len(datasets)
+
+            # Read datasets
+            results = []
+            self._log(
+                f"{Fore.BLUE}ℹ Reading back datasets and calculating metrics...{Style.RESET_ALL}"
+            )
             for name, data, _ in datasets:
-                print(f"{Fore.BLUE}ℹ Reading {name} dataset...{Style.RESET_ALL}")
-                # Read data
-                decompressed_data = f[name][:]
-
-                # Check shape and dtype
+                self._log(f"{Fore.BLUE}ℹ Reading {name} dataset...{Style.RESET_ALL}")
+                # Read data; 16-bit datasets go through the dequantizing
+                # __getitem__ patch
+                if data.dtype == np.uint8:
+                    decompressed_data = self.read_8bit(f[name])
+                else:
+                    decompressed_data = f[name][:]
+
+                # The one place each dtype's round trip is checked for shape
+                # and dtype; reads into the shared 8-bit buffer can't change
+                # either, so the other tests skip this
                 self.assertEqual(decompressed_data.shape, data.shape)
                 self.assertEqual(decompressed_data.dtype, data.dtype)
-                print(
-                    f"{Fore.GREEN}✓ Shape and dtype match for {name}{Style.RESET_ALL}"
-                )
 
                 # Check quality
                 psnr = calculate_psnr(data, decompressed_data)
 
-                # Calculate approximate size for this dataset
-                # This is an approximation since the file contains multiple datasets
-                file_info = os.stat(h5_file)
-                file_size_kb = file_info.st_size / 1024 / len(datasets)
-
                 # Calculate approximate compression ratio
                 original_size = data.nbytes
                 compression_ratio = original_size / (file_size_kb * 1024)
@@ -348,166 +431,104 @@ class TestIntegration(unittest.TestCase):
                 # PSNR threshold depends on bit depth
                 min_psnr = 40.0 if name == "data_8bit" else 45.0
                 self.assertGreater(psnr, min_psnr, f"PSNR for {name} is too low")
-                print(
+                self._log(
                     f"{Fore.GREEN}✓ {name} has acceptable quality (PSNR > {min_psnr} dB){Style.RESET_ALL}"
                 )
 
         # Print results table
         self.print_result_table(results)
 
-    def test_hierarchical_groups(self):
-        """Test with hierarchical groups."""
-        # Create a temporary HDF5 file
-        h5_file = os.path.join(self.temp_dir, "test_groups.h5")
-        print(
-            f"{Fore.BLUE}ℹ Testing hierarchical group structure with compressed datasets...{Style.RESET_ALL}"
+    def test_groups_attrs_mixed(self):
+        """Test groups, attributes and mixed compression in one file."""
+        # One encode covers all three scenarios: the nested datasets are
+        # copies of the root one and the uncompressed sibling is stored raw
+        h5_file = os.path.join(self.temp_dir, "test_groups_attrs_mixed.h5")
+        self._log(
+            f"{Fore.BLUE}ℹ Testing groups, attributes and mixed compression in one file...{Style.RESET_ALL}"
         )
 
         # Compression options
-        compression_options = hf.x264(crf=23)
+        compression_options = self.FAST_OPTS
+
+        self._log(
+            f"{Fore.BLUE}ℹ Creating groups, attributes and datasets...{Style.RESET_ALL}"
+        )
+        with _open_w(h5_file) as f:
+            # Root attributes
+            f.attrs["description"] = "Test file for FFMPEG HDF5 filter"
+            f.attrs["creation_date"] = "2023-01-01"
 
-        # Create hierarchical structure
-        print(f"{Fore.BLUE}ℹ Creating hierarchical group structure...{Style.RESET_ALL}")
-        with h5py.File(h5_file, "w") as f:
-            # Create groups
+            # Create groups, one of them with attributes
             group1 = f.create_group("group1")
             group2 = group1.create_group("group2")
+            metadata = f.create_group("metadata")
+            metadata.attrs["version"] = "1.0"
 
-            # Create datasets at different levels
-            print(
+            # Compressed dataset with attributes at the root
+            self._log(
                 f"{Fore.BLUE}ℹ Creating compressed dataset at root level...{Style.RESET_ALL}"
             )
-            f.create_dataset(
+            root = f.create_dataset(
                 "root_data", data=self.test_data_8bit, **compression_options
             )
+            root.attrs["codec"] = "H.264"
+            root.attrs["crf"] = 23
+            root.attrs["dimensions"] = [self.depth, self.height, self.width]
 
-            print(
-                f"{Fore.BLUE}ℹ Creating compressed dataset at level 1...{Style.RESET_ALL}"
-            )
-            group1.create_dataset(
-                "level1_data", data=self.test_data_8bit, **compression_options
-            )
-
-            print(
-                f"{Fore.BLUE}ℹ Creating compressed dataset at level 2...{Style.RESET_ALL}"
-            )
-            group2.create_dataset(
-                "level2_data", data=self.test_data_8bit, **compression_options
-            )
-
-        # Read datasets from different levels
-        print(
-            f"{Fore.BLUE}ℹ Reading datasets from different hierarchy levels...{Style.RESET_ALL}"
-        )
-        with h5py.File(h5_file, "r") as f:
-            # Check root level
-            print(f"{Fore.BLUE}ℹ Reading root level dataset...{Style.RESET_ALL}")
-            root_data = f["root_data"][:]
-            self.assertEqual(root_data.shape, self.test_data_8bit.shape)
-            print(
-                f"{Fore.GREEN}✓ Root level dataset read successfully{Style.RESET_ALL}"
-            )
-
-            # Check level 1
-            print(f"{Fore.BLUE}ℹ Reading level 1 dataset...{Style.RESET_ALL}")
-            level1_data = f["group1/level1_data"][:]
-            self.assertEqual(level1_data.shape, self.test_data_8bit.shape)
-            print(f"{Fore.GREEN}✓ Level 1 dataset read successfully{Style.RESET_ALL}")
-
-            # Check level 2
-            print(f"{Fore.BLUE}ℹ Reading level 2 dataset...{Style.RESET_ALL}")
-            level2_data = f["group1/group2/level2_data"][:]
-            self.assertEqual(level2_data.shape, self.test_data_8bit.shape)
-            print(f"{Fore.GREEN}✓ Level 2 dataset read successfully{Style.RESET_ALL}")
-
-            # Calculate PSNR for all levels
-            root_psnr = calculate_psnr(self.test_data_8bit, root_data)
-            level1_psnr = calculate_psnr(self.test_data_8bit, level1_data)
-            level2_psnr = calculate_psnr(self.test_data_8bit, level2_data)
-
-            # Calculate file size
-            file_size_kb = os.path.getsize(h5_file) / 1024
-
-            # Print results
-            print(f"{Fore.BLUE}ℹ PSNR values:{Style.RESET_ALL}")
-            print(f"{Fore.BLUE}ℹ Root level: {root_psnr:.2f} dB{Style.RESET_ALL}")
-            print(f"{Fore.BLUE}ℹ Level 1: {level1_psnr:.2f} dB{Style.RESET_ALL}")
-            print(f"{Fore.BLUE}ℹ Level 2: {level2_psnr:.2f} dB{Style.RESET_ALL}")
-
-            # Verify quality
-            self.assertGreater(root_psnr, 40.0)
-            self.assertGreater(level1_psnr, 40.0)
-            self.assertGreater(level2_psnr, 40.0)
-            print(
-                f"{Fore.GREEN}✓ All hierarchical datasets have good quality (PSNR > 40 dB){Style.RESET_ALL}"
+            # The nested datasets reuse the encoded chunks
+            self._log(
+                f"{Fore.BLUE}ℹ Copying compressed dataset to levels 1 and 2...{Style.RESET_ALL}"
             )
+            f.copy(root, group1, name="level1_data")
+            f.copy(root, group2, name="level2_data")
 
-    def test_attributes(self):
-        """Test with dataset and group attributes."""
-        # Create a temporary HDF5 file
-        h5_file = os.path.join(self.temp_dir, "test_attributes.h5")
-        print(
-            f"{Fore.BLUE}ℹ Testing dataset and group attributes with compression...{Style.RESET_ALL}"
-        )
-
-        # Compression options
-        compression_options = hf.x264(crf=23)
-
-        # Create file with attributes
-        print(
-            f"{Fore.BLUE}ℹ Creating file with attributes at various levels...{Style.RESET_ALL}"
-        )
-        with h5py.File(h5_file, "w") as f:
-            # Root attributes
-            f.attrs["description"] = "Test file for FFMPEG HDF5 filter"
-            f.attrs["creation_date"] = "2023-01-01"
-
-            # Create dataset with attributes
-            dset = f.create_dataset(
-                "data", data=self.test_data_8bit, **compression_options
-            )
-            dset.attrs["codec"] = "H.264"
-            dset.attrs["crf"] = 23
-            dset.attrs["dimensions"] = [self.depth, self.height, self.width]
+            # Uncompressed sibling
+            self._log(f"{Fore.BLUE}ℹ Creating uncompressed dataset...{Style.RESET_ALL}")
+            f.create_dataset("uncompressed", data=self.test_data_8bit)
 
-            # Create group with attributes
-            group = f.create_group("metadata")
-            group.attrs["version"] = "1.0"
+        file_size_kb = os.path.getsize(h5_file) / 1024
 
-        # Read attributes
-        print(
-            f"{Fore.BLUE}ℹ Reading back attributes from various levels...{Style.RESET_ALL}"
-        )
-        with h5py.File(h5_file, "r") as f:
-            # Check root attributes
-            print(f"{Fore.BLUE}ℹ Checking root attributes...{Style.RESET_ALL}")
+        self._log(f"{Fore.BLUE}ℹ Reading everything back...{Style.RESET_ALL}")
+        with _open_r(h5_file) as f:
+            # Check attributes
             self.assertEqual(f.attrs["description"], "Test file for FFMPEG HDF5 filter")
             self.assertEqual(f.attrs["creation_date"], "2023-01-01")
-            print(f"{Fore.GREEN}✓ Root attributes verified{Style.RESET_ALL}")
-
-            # Check dataset attributes
-            print(f"{Fore.BLUE}ℹ Checking dataset attributes...{Style.RESET_ALL}")
-            dset = f["data"]
+            dset = f["root_data"]
             self.assertEqual(dset.attrs["codec"], "H.264")
             self.assertEqual(dset.attrs["crf"], 23)
             np.testing.assert_array_equal(
                 dset.attrs["dimensions"], [self.depth, self.height, self.width]
             )
-            print(f"{Fore.GREEN}✓ Dataset attributes verified{Style.RESET_ALL}")
+            self.assertEqual(f["metadata"].attrs["version"], "1.0")
+            self._log(
+                f"{Fore.GREEN}✓ Root, dataset and group attributes verified{Style.RESET_ALL}"
+            )
 
-            # Check group attributes
-            print(f"{Fore.BLUE}ℹ Checking group attributes...{Style.RESET_ALL}")
-            group = f["metadata"]
-            self.assertEqual(group.attrs["version"], "1.0")
-            print(f"{Fore.GREEN}✓ Group attributes verified{Style.RESET_ALL}")
+            # Every level decodes through the filter; the shared buffer means
+            # each PSNR is taken right after its read
+            uncomp_data = f["uncompressed"][:]
+            psnrs = {}
+            for path in (
+                "root_data",
+                "group1/level1_data",
+                "group1/group2/level2_data",
+            ):
+                data = self.read_8bit(f[path])
+                psnrs[path] = calculate_psnr(uncomp_data, data)
+                self._log(
+                    f"{Fore.BLUE}ℹ {path}: PSNR = {psnrs[path]:.2f} dB{Style.RESET_ALL}"
+                )
 
-            # Read and check data quality
-            decompressed_data = dset[:]
-            psnr = calculate_psnr(self.test_data_8bit, decompressed_data)
-            print(
-                f"{Fore.BLUE}ℹ PSNR for dataset with attributes: {psnr:.2f} dB{Style.RESET_ALL}"
+            self._log(
+                f"{Fore.BLUE}ℹ Total file size: {file_size_kb:.1f} KB{Style.RESET_ALL}"
+            )
+
+            # Verify quality against the uncompressed copy
+            for path, psnr in psnrs.items():
+                self.assertGreater(psnr, 40.0, f"PSNR for {path} is too low")
+            self._log(
+                f"{Fore.GREEN}✓ All compressed datasets match the uncompressed one (PSNR > 40 dB){Style.RESET_ALL}"
             )
-            self.assertGreater(psnr, 40.0)
 
     def test_h5py_filter_pipeline(self):
         """Test with multiple filters in h5py pipeline."""
@@ -515,21 +536,21 @@ class TestIntegration(unittest.TestCase):
         try:
             # Create a temporary HDF5 file
             h5_file = os.path.join(self.temp_dir, "test_pipeline.h5")
-            print(
+            self._log(
                 f"{Fore.BLUE}ℹ Testing filter pipeline with multiple filters...{Style.RESET_ALL}"
             )
 
             # Compression options for FFMPEG
             ffmpeg_options = {
                 "compression": hf.FFMPEG_ID,
-                "compression_opts": hf.x264(crf=23)["compression_opts"],
+                "compression_opts": self.FAST_OPTS["compression_opts"],
             }
 
             # Try to use FFMPEG filter with shuffle filter
-            print(
+            self._log(
                 f"{Fore.BLUE}ℹ Creating dataset with both FFMPEG and shuffle filters...{Style.RESET_ALL}"
             )
-            with h5py.File(h5_file, "w") as f:
+            with _open_w(h5_file) as f:
                 dset = f.create_dataset(
                     "data",
                     data=self.test_data_8bit,
@@ -538,15 +559,15 @@ class TestIntegration(unittest.TestCase):
                 )
 
             # Read data
-            print(
+            self._log(
                 f"{Fore.BLUE}ℹ Reading back data compressed with multiple filters...{Style.RESET_ALL}"
             )
-            with h5py.File(h5_file, "r") as f:
-                decompressed_data = f["data"][:]
+            with _open_r(h5_file) as f:
+                decompressed_data = self.read_8bit(f["data"])
 
                 # Check quality
                 psnr = calculate_psnr(self.test_data_8bit, decompressed_data)
-                print(
+                self._log(
                     f"{Fore.BLUE}ℹ PSNR with filter pipeline: {psnr:.2f} dB{Style.RESET_ALL}"
                 )
                 self.assertGreater(psnr, 40.0)
@@ -560,86 +581,30 @@ class TestIntegration(unittest.TestCase):
                 results = [("FFMPEG + Shuffle", psnr, compression_ratio, file_size_kb)]
                 self.print_result_table(results)
 
-                print(f"{Fore.GREEN}✓ Filter pipeline test passed{Style.RESET_ALL}")
+                self._log(f"{Fore.GREEN}✓ Filter pipeline test passed{Style.RESET_ALL}")
 
         except Exception as e:
-            print(
+            self._log(
                 f"{Fore.YELLOW}⚠ Filter pipeline test skipped: {str(e)}{Style.RESET_ALL}"
             )
             self.skipTest(f"Filter pipeline test skipped: {str(e)}")
 
-    def test_mixed_compression(self):
-        """Test with mixed compressed and uncompressed datasets."""
-        # Create a temporary HDF5 file
-        h5_file = os.path.join(self.temp_dir, "test_mixed.h5")
-        print(
-            f"{Fore.BLUE}ℹ Testing file with mixed compressed and uncompressed datasets...{Style.RESET_ALL}"
-        )
-
-        # Compression options
-        compression_options = hf.x264(crf=23)
-
-        # Write data
-        print(
-            f"{Fore.BLUE}ℹ Writing compressed and uncompressed datasets to same file...{Style.RESET_ALL}"
-        )
-        with h5py.File(h5_file, "w") as f:
-            # Compressed dataset
-            print(f"{Fore.BLUE}ℹ Creating compressed dataset...{Style.RESET_ALL}")
-            f.create_dataset(
-                "compressed", data=self.test_data_8bit, **compression_options
-            )
-
-            # Uncompressed dataset
-            print(f"{Fore.BLUE}ℹ Creating uncompressed dataset...{Style.RESET_ALL}")
-            f.create_dataset("uncompressed", data=self.test_data_8bit)
-
-        # Read data
-        print(f"{Fore.BLUE}ℹ Reading both datasets back...{Style.RESET_ALL}")
-        with h5py.File(h5_file, "r") as f:
-            compressed_data = f["compressed"]
-            uncompressed_data = f["uncompressed"]
-
-            # Read both datasets
-            comp_data = compressed_data[:]
-            uncomp_data = uncompressed_data[:]
-
-            # Check shapes
-            self.assertEqual(comp_data.shape, uncomp_data.shape)
-            print(f"{Fore.GREEN}✓ Both datasets have same shape{Style.RESET_ALL}")
-
-            # Check quality
-            psnr = calculate_psnr(uncomp_data, comp_data)
-            print(
-                f"{Fore.BLUE}ℹ Compressed vs. Uncompressed: PSNR = {psnr:.2f} dB{Style.RESET_ALL}"
-            )
-            self.assertGreater(psnr, 40.0)
-            print(
-                f"{Fore.GREEN}✓ Compressed data matches uncompressed with high quality (PSNR > 40 dB){Style.RESET_ALL}"
-            )
-
-            # Calculate file size
-            file_size_kb = os.path.getsize(h5_file) / 1024
-            print(
-                f"{Fore.BLUE}ℹ Total file size: {file_size_kb:.1f} KB{Style.RESET_ALL}"
-            )
-
     def test_delayed_data_setting(self):
         """Test creating datasets without initial data and setting data later."""
         # Create a temporary HDF5 file
         h5_file = os.path.join(self.temp_dir, "test_delayed_data.h5")
-        print(
+        self._log(
             f"{Fore.BLUE}ℹ Testing datasets created without initial data...{Style.RESET_ALL}"
         )
 
         # Compression options
-        compression_options = hf.x264(crf=23)
+        compression_options = self.FAST_OPTS
 
         # Create file with empty dataset and set data later
-        print(
+        self._log(
             f"{Fore.BLUE}ℹ Creating empty dataset with compression...{Style.RESET_ALL}"
         )
-        with h5py.File(h5_file, "w") as f:
+        with _open_w(h5_file) as f:
             # Create empty dataset with same shape as test data
             dset = f.create_dataset(
                 "delayed_data",
@@ -649,13 +614,14 @@ class TestIntegration(unittest.TestCase):
                 **compression_options,
             )
 
-            print(f"{Fore.BLUE}ℹ Setting data in slices...{Style.RESET_ALL}")
+            self._log(f"{Fore.BLUE}ℹ Setting data in slices...{Style.RESET_ALL}")
 
+            # Split on the first-dim chunk boundary so each chunk is encoded
+            # exactly once
             dset[0:10, :, :] = self.test_data_8bit[0:10, :, :]
-            dset[10:40, :, :] = self.test_data_8bit[10:40, :, :]
-            dset[40:50, :, :] = self.test_data_8bit[40:50, :, :]
+            dset[10:50, :, :] = self.test_data_8bit[10:50, :, :]
 
-            print(
+            self._log(
                 f"{Fore.BLUE}ℹ Creating dataset for single value setting...{Style.RESET_ALL}"
             )
             single_dset = f.create_dataset(
@@ -667,34 +633,33 @@ class TestIntegration(unittest.TestCase):
             )
 
             # Set individual values
-            print(f"{Fore.BLUE}ℹ Setting individual values...{Style.RESET_ALL}")
+            self._log(f"{Fore.BLUE}ℹ Setting individual values...{Style.RESET_ALL}")
             single_dset[0:50, 0:50, 0:50] = 100
             single_dset[50:100, 50:100, 50:100] = 200
 
         # Read data back and verify
-        print(f"{Fore.BLUE}ℹ Reading back data and verifying...{Style.RESET_ALL}")
-        with h5py.File(h5_file, "r") as f:
-            read_data = f["delayed_data"][:]
+        self._log(f"{Fore.BLUE}ℹ Reading back data and verifying...{Style.RESET_ALL}")
+        with _open_r(h5_file) as f:
+            read_data = self.read_8bit(f["delayed_data"])
 
-            self.assertEqual(read_data.shape, self.test_data_8bit.shape)
             psnr = calculate_psnr(self.test_data_8bit, read_data)
-            print(
+            self._log(
                 f"{Fore.BLUE}ℹ PSNR for delayed data setting: {psnr:.2f} dB{Style.RESET_ALL}"
             )
             self.assertGreater(psnr, 40.0)
 
-            single_read = f["single_values"][:]
-
-            region1 = single_read[0:50, 0:50, 0:50]
-            region2 = single_read[50:100, 50:100, 50:100]
+            # Only read the two regions that were written
+            single_dset = f["single_values"]
+            region1 = single_dset[0:50, 0:50, 0:50]
+            region2 = single_dset[50:100, 50:100, 50:100]
 
-            mean_value_region1 = np.mean(region1)
-            mean_value_region2 = np.mean(region2)
+            mean_value_region1 = float(region1.sum(dtype=np.int64)) / region1.size
+            mean_value_region2 = float(region2.sum(dtype=np.int64)) / region2.size
 
-            print(
+            self._log(
                 f"{Fore.BLUE}ℹ Mean value in region 1: {mean_value_region1:.2f} (expected ~100){Style.RESET_ALL}"
             )
-            print(
+            self._log(
                 f"{Fore.BLUE}ℹ Mean value in region 2: {mean_value_region2:.2f} (expected ~200){Style.RESET_ALL}"
             )
 
@@ -704,7 +669,7 @@ class TestIntegration(unittest.TestCase):
             self.assertGreater(mean_value_region2, 195)  # Lower bound
             self.assertLess(mean_value_region2, 205)  # Upper bound
 
-            print(
+            self._log(
                 f"{Fore.GREEN}✓ Delayed data setting and single value setting tests passed{Style.RESET_ALL}"
             )
 